@@ -1,17 +1,33 @@
 import os
 import asyncio
+import contextlib
 import aiohttp
+import html
+import logging
 import signal
 import sys
 import platform
+import time
 from datetime import datetime, timezone
 from dotenv import load_dotenv
 from googleapiclient.discovery import build
-from telegram import Bot, Update, InlineKeyboardButton, InlineKeyboardMarkup
+from googleapiclient.http import HttpRequest
+from telegram import Bot, Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto
 from telegram.constants import ParseMode
 from telegram.ext import Application, CommandHandler, ContextTypes, CallbackQueryHandler
 from io import BytesIO
+from pathlib import Path
 from telegram_config import TelegramConfig  # Import from local telegram_config.py file
+from telegram_request import build_notification_request, build_updates_request
+from config_watcher import build_config_watcher
+from bot_logging import setup_logging
+from profiler import ProfileSession
+from coalescer import build_coalescer, MEDIA_GROUP_LIMIT
+from live_tracker import build_live_tracker, parse_time
+from channel_cache import build_channel_cache, CHANNELS_PER_REQUEST
+from chat_health import build_chat_health, classify, DEAD, MIGRATED, THROTTLED, TRANSIENT
+from traffic_trace import build_recorder, recording_request_class
+from content_filter import describe_filters, normalize_filters
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application,
@@ -25,19 +41,37 @@ from telegram.constants import ParseMode
 # Load environment variables
 load_dotenv()
 
+monitor_log = logging.getLogger('ytbot.monitor')
+sender_log = logging.getLogger('ytbot.sender')
+commands_log = logging.getLogger('ytbot.commands')
+pool_log = logging.getLogger('ytbot.pool')
+
+def tenant_setting(name: str, key: str) -> str:
+    """Read a per-tenant setting, e.g. TELEGRAM_BOT_TOKEN_BRAND_A, or the plain one for the default tenant"""
+    if name:
+        key = f"{key}_{name.upper().replace('-', '_')}"
+    return os.getenv(key, '')
+
+
 class YouTubeTelegramBot:
-    def __init__(self):
-        self.youtube = build('youtube', 'v3', developerKey=os.getenv('YOUTUBE_API_KEY'))
-        self.bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
-        self.bot = Bot(token=self.bot_token)
-        self.admin_users = [int(uid) for uid in str(os.getenv('ADMIN_USERS', '')).split(',') if uid]
-        self.config = TelegramConfig()
-        self.check_interval = int(os.getenv('CHECK_INTERVAL', '300'))
-        self.running = False
-        self.last_check = {}
-        self.shutdown_event = asyncio.Event()
-        self.channel_cache = {}
+    """One Telegram bot with its own token, admins, chats and channels, fed by a shared DetectionEngine"""
+
+    def __init__(self, engine, name: str = None, config: TelegramConfig = None, notify_request=None,
+                 bot_token: str = None):
+        self.engine = engine
+        self.name = name or 'default'
+        self.bot_token = bot_token or tenant_setting(name, 'TELEGRAM_BOT_TOKEN')
+        # Notification fan-out gets its own sized pool, separate from the Application's
+        self.notify_request = notify_request or build_notification_request()
+        self.notify_request.recorder = engine.recorder
+        self.bot = Bot(token=self.bot_token, request=self.notify_request)
+        self.admin_users = [int(uid) for uid in tenant_setting(name, 'ADMIN_USERS').split(',') if uid]
+        # The default tenant keeps the original Pydata layout, named tenants get a subfolder each
+        self.config = config or TelegramConfig(engine.data_folder / name if name else None)
+        self.chat_health = build_chat_health()
+        self.coalescer = build_coalescer(self.send_digests)
         self.title_cache = {}
+        engine.add_tenant(self)
 
     def is_admin(self, user_id: int) -> bool:
         """Check if user is an admin"""
@@ -74,7 +108,6 @@ class YouTubeTelegramBot:
         
         return False
 
-
     async def cmd_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start_notify command"""
         user_id = update.effective_user.id
@@ -116,12 +149,16 @@ class YouTubeTelegramBot:
             "🔔 <b>Notification Commands:</b>\n"
             "/add_telegram_notify - Add current chat to notification list\n"
             "/remove_notify - Remove current chat from notification list\n"
-            "/list_notify - List all chats receiving notifications\n\n"
+            "/list_notify - List all chats receiving notifications\n"
+            "/filter_notify - Show or set a chat's content filters\n\n"
             "📺 <b>YouTube Channel Commands:</b>\n"
             "/add_youtube_channel - Add a YouTube channel to monitor\n"
             "/remove_youtube_channel - Remove a YouTube channel\n"
             "/list_youtube_channels - List all monitored channels\n\n"
             "❓ <b>Other Commands:</b>\n"
+            "/pool_notify - Show notification connection pool usage\n"
+            "/health_notify - Show chat delivery health\n"
+            "/profile_notify [seconds] - Profile the bot and send a report\n"
             "/start_notify - Show welcome message\n"
             "/help_notify - Show this help message\n"
             "/how_notify - Show quick setup guide\n\n"
@@ -187,7 +224,7 @@ class YouTubeTelegramBot:
             return
 
         try:
-            chat = await self.bot.get_chat(chat_id)
+            chat = await context.bot.get_chat(chat_id)
             chat_title = chat.title or str(chat_id)
             
             if self.config.add_chat(chat_id, chat_title, chat_type):
@@ -225,7 +262,7 @@ class YouTubeTelegramBot:
             return
 
         try:
-            chat = await self.bot.get_chat(chat_id)
+            chat = await context.bot.get_chat(chat_id)
             chat_title = chat.title or str(chat_id)
             
             if self.config.remove_chat(chat_id):
@@ -275,22 +312,22 @@ class YouTubeTelegramBot:
 
             chat_list = []
             for chat in chats:
-                chat_id = chat['id']
+                chat_id = chat.id
                 try:
-                    chat_info = await self.bot.get_chat(chat_id)
+                    chat_info = await context.bot.get_chat(chat_id)
                     chat_title = chat_info.title or str(chat_id)
                     chat_type = chat_info.type
                     chat_list.append(
                         f"• <b>{chat_title}</b>\n"
                         f"  Type: {chat_type}\n"
                         f"  ID: <code>{chat_id}</code>\n"
-                        f"  Added: {chat.get('added_at', 'Unknown')}"
+                        f"  Added: {chat.added_text()}"
                     )
                 except Exception:
                     chat_list.append(
                         f"• ID: <code>{chat_id}</code>\n"
-                        f"  Type: {chat.get('type', 'unknown')}\n"
-                        f"  Added: {chat.get('added_at', 'Unknown')}\n"
+                        f"  Type: {chat.type}\n"
+                        f"  Added: {chat.added_text()}\n"
                         f"  (Unable to get current chat info)"
                     )
 
@@ -315,9 +352,207 @@ class YouTubeTelegramBot:
                 parse_mode=ParseMode.HTML
             )
 
+    async def cmd_filter(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /filter_notify command"""
+        user_id = update.effective_user.id
+
+        if not self.is_admin(user_id):
+            await update.message.reply_text(
+                "⛔️ Sorry, only admin users can use this command.",
+                parse_mode=ParseMode.HTML
+            )
+            return
+
+        args = list(context.args or [])
+        # Without a chat ID the command applies to the chat it was sent in
+        chat_id = update.effective_chat.id
+        if args and args[0].lstrip('-').isdigit():
+            chat_id = int(args.pop(0))
+
+        chat = self.config.chat_index.get(chat_id)
+        if chat is None:
+            await update.message.reply_text(
+                f"❌ Chat <code>{chat_id}</code> is not in the notification list.",
+                parse_mode=ParseMode.HTML
+            )
+            return
+
+        try:
+            current = normalize_filters(chat.filters or {})
+            summary = describe_filters(current)
+        except (ValueError, TypeError) as e:
+            # A broken hand edit is replaced by whatever is set next
+            current = {}
+            summary = f"invalid, ignored: {e}"
+
+        if not args:
+            await update.message.reply_text(
+                f"🧹 <b>Filters for</b> <code>{chat_id}</code>\n\n"
+                f"{html.escape(summary)}\n\n"
+                "Usage: /filter_notify [chat_id] min=PT1M max=3600 include=a,b exclude=c,d "
+                "shorts=off live=off replays=off\n"
+                "Use /filter_notify [chat_id] clear to remove all filters",
+                parse_mode=ParseMode.HTML
+            )
+            return
+
+        if args == ['clear']:
+            filters = {}
+        else:
+            aliases = {'min': 'min_duration', 'max': 'max_duration'}
+            filters = dict(current)
+            try:
+                for arg in args:
+                    key, sep, value = arg.partition('=')
+                    if not sep:
+                        raise ValueError(f"Expected key=value, got {arg}")
+                    filters[aliases.get(key.lower(), key.lower())] = value
+                filters = normalize_filters(filters)
+            except ValueError as e:
+                await update.message.reply_text(
+                    f"❌ {html.escape(str(e))}",
+                    parse_mode=ParseMode.HTML
+                )
+                return
+
+        self.config.set_chat_filters(chat_id, filters)
+        await update.message.reply_text(
+            f"✅ Filters for <code>{chat_id}</code> updated\n\n{html.escape(describe_filters(filters))}",
+            parse_mode=ParseMode.HTML
+        )
+
+    async def cmd_pool(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /pool_notify command"""
+        user_id = update.effective_user.id
+
+        if not self.is_admin(user_id):
+            await update.message.reply_text(
+                "⛔️ Sorry, only admin users can use this command.",
+                parse_mode=ParseMode.HTML
+            )
+            return
+
+        metrics = self.notify_request.get_metrics()
+        await update.message.reply_text(
+            f"📊 <b>Notification Connection Pool</b>\n\n"
+            f"Pool size: {metrics['pool_size']}\n"
+            f"In flight: {metrics['in_flight']} ({metrics['saturation']:.0%})\n"
+            f"Peak in flight: {metrics['peak_in_flight']} ({metrics['peak_saturation']:.0%})\n"
+            f"Total requests: {metrics['total_requests']}\n"
+            f"Pool timeouts: {metrics['pool_timeouts']}",
+            parse_mode=ParseMode.HTML
+        )
+
+    async def cmd_health(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /health_notify command"""
+        user_id = update.effective_user.id
+
+        if not self.is_admin(user_id):
+            await update.message.reply_text(
+                "⛔️ Sorry, only admin users can use this command.",
+                parse_mode=ParseMode.HTML
+            )
+            return
+
+        summary = self.chat_health.summary()
+        now = time.monotonic()
+        lines = [
+            "🩺 <b>Chat Health</b>\n",
+            f"Configured chats: {len(self.config.get_chats())}",
+            f"Open circuits: {len(summary['open'])}",
+            f"Degraded: {len(summary['degraded'])}",
+            f"Waiting for removal: {len(summary['dead'])}",
+            f"Pruned: {len(summary['pruned'])}",
+            f"Migrated: {len(summary['migrations'])}",
+        ]
+        if summary['open']:
+            lines.append("\n<b>Open circuits:</b>")
+            for chat_id, state in summary['open'].items():
+                lines.append(
+                    f"• <code>{chat_id}</code> - {state.failures} failures, "
+                    f"retry in {int(state.open_until - now)}s\n  {html.escape(state.last_error)}"
+                )
+        if summary['degraded']:
+            lines.append("\n<b>Degraded:</b>")
+            for chat_id, state in summary['degraded'].items():
+                lines.append(f"• <code>{chat_id}</code> - {state.failures} failures\n  {html.escape(state.last_error)}")
+        if summary['pruned']:
+            lines.append("\n<b>Pruned:</b>")
+            for chat_id, reason in summary['pruned'].items():
+                lines.append(f"• <code>{chat_id}</code> - {html.escape(reason)}")
+        if summary['migrations']:
+            lines.append("\n<b>Migrated:</b>")
+            for old_chat_id, new_chat_id in summary['migrations'].items():
+                lines.append(f"• <code>{old_chat_id}</code> → <code>{new_chat_id}</code>")
+
+        message = "\n".join(lines)
+        for i in range(0, len(message), 4096):
+            await update.message.reply_text(
+                message[i:i + 4096],
+                parse_mode=ParseMode.HTML
+            )
+
+    async def cmd_profile(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /profile_notify command"""
+        user_id = update.effective_user.id
+
+        if not self.is_admin(user_id):
+            await update.message.reply_text(
+                "⛔️ Sorry, only admin users can use this command.",
+                parse_mode=ParseMode.HTML
+            )
+            return
+
+        if self.engine.profile_session is not None:
+            await update.message.reply_text(
+                "ℹ️ A profiling session is already running.",
+                parse_mode=ParseMode.HTML
+            )
+            return
+
+        try:
+            duration = int(context.args[0]) if context.args else 60
+        except ValueError:
+            duration = 0
+        if not 1 <= duration <= 600:
+            await update.message.reply_text(
+                "❌ Usage: /profile_notify [seconds]\n\n"
+                "Seconds must be between 1 and 600 (default: 60)",
+                parse_mode=ParseMode.HTML
+            )
+            return
+
+        # Profiles the whole process, so one session at a time across all tenants
+        self.engine.profile_session = ProfileSession(self.engine, duration)
+        await update.message.reply_text(
+            f"⏱ Profiling for {duration} seconds, the report will be sent here.",
+            parse_mode=ParseMode.HTML
+        )
+        # Run in the background so other commands are handled while profiling
+        context.application.create_task(self.run_profile(update))
+
+    async def run_profile(self, update: Update):
+        """Run the active profiling session and send the report as a file"""
+        try:
+            report = await self.engine.profile_session.run()
+            filename = f"profile_{datetime.now(timezone.utc):%Y%m%d_%H%M%S}.txt"
+            await update.message.reply_document(
+                document=BytesIO(report.encode('utf-8')),
+                filename=filename,
+                caption="📊 Profiling report"
+            )
+        except Exception as e:
+            commands_log.error("Profiling failed", extra={'error': str(e)})
+            await update.message.reply_text(
+                f"❌ Error while profiling: {str(e)}",
+                parse_mode=ParseMode.HTML
+            )
+        finally:
+            self.engine.profile_session = None
+
     async def error_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle Telegram errors"""
-        print(f'Telegram Error: {context.error}')
+        commands_log.error("Telegram error", extra={'error': str(context.error)})
 
    #------------------------------------------------------------------------------------#
     async def cmd_add_youtube_channel(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -345,8 +580,8 @@ class YouTubeTelegramBot:
         
         try:
             # Verify channel exists on YouTube before adding
-            response = self.youtube.channels().list(
-                part="snippet",
+            response = self.engine.youtube.channels().list(
+                part="snippet,contentDetails",
                 id=channel_id
             ).execute()
             
@@ -360,6 +595,9 @@ class YouTubeTelegramBot:
             
             # Get actual channel name from YouTube if available
             actual_name = response['items'][0]['snippet']['title']
+            # Re-adding a channel also lifts a suspension
+            self.engine.channel_cache.record_verified(channel_id, response['items'][0])
+            self.engine.channel_cache.save()
             
             if self.config.add_youtube_channel(actual_name, channel_id):
                 await update.message.reply_text(
@@ -407,7 +645,7 @@ class YouTubeTelegramBot:
         if self.config.remove_youtube_channel(channel_id):
             await update.message.reply_text(
                 f"✅ Successfully removed YouTube channel!\n\n"
-                f"Channel: <b>{channel['name']}</b>\n"
+                f"Channel: <b>{channel.name}</b>\n"
                 f"ID: <code>{channel_id}</code>",
                 parse_mode=ParseMode.HTML
             )
@@ -441,9 +679,14 @@ class YouTubeTelegramBot:
         
         channel_list = []
         for channel in channels:
+            status = "\n  ⚠️ Suspended (failed verification)" if self.engine.channel_cache.is_suspended(channel.id) else ""
+            # Renames are picked up by the metadata refresh, the configured name stays as entered
+            entry = self.engine.channel_cache.get(channel.id)
+            if entry and entry.get('title') and entry['title'] != channel.name:
+                status = f"\n  YouTube title: {html.escape(entry['title'])}" + status
             channel_list.append(
-                f"• <b>{channel['name']}</b>\n"
-                f"  ID: <code>{channel['id']}</code>"
+                f"• <b>{channel.name}</b>\n"
+                f"  ID: <code>{channel.id}</code>{status}"
             )
         
         message = "📝 <b>Monitored YouTube Channels:</b>\n\n" + "\n\n".join(channel_list)
@@ -454,40 +697,339 @@ class YouTubeTelegramBot:
         )
     #----------------------------------------------------------------------------------#
 
-    async def get_channel_id(self, channel_data):
-        """Get channel ID from channel data dictionary"""
-        try:
-            channel_id = channel_data['id'].strip()
-            channel_name = channel_data['name']
-            
-            # Check cache first
-            if channel_id in self.channel_cache:
-                return self.channel_cache[channel_id]
+    async def send_notifications(self, video, thumbnail_data, caption):
+        """Send notifications to every configured Telegram chat whose filters let the video through"""
+        chat_ids = self.config.get_content_filter().recipients(video)
 
-            # Verify the channel ID exists
-            response = self.youtube.channels().list(
-                part="id,snippet",
-                id=channel_id
-            ).execute()
+        if self.coalescer.enabled:
+            # Hold the video so a burst of uploads goes out as one message per chat
+            for chat_id in chat_ids:
+                self.coalescer.add(chat_id, (thumbnail_data, caption))
+            return
 
-            if response.get('items'):
-                self.channel_cache[channel_id] = channel_id
-                print(f"Successfully verified channel: {channel_name} ({channel_id})")
-                return channel_id
+        total_chats = len(chat_ids)
+        
+        batch_size = 3
+        for i in range(0, total_chats, batch_size):
+            if self.engine.shutdown_event.is_set():
+                return
+                
+            batch = chat_ids[i:i + batch_size]
+            for chat_id in batch:
+                await self.send_notification_to_chat(chat_id, thumbnail_data, caption)
             
-            print(f"Could not verify channel ID {channel_id} for {channel_name}")
-            return None
+            if i + batch_size < total_chats:
+                await asyncio.sleep(3)
+
+        self.prune_dead_chats()
+
+    async def send_digests(self, digests):
+        """Send the coalesced notifications of every chat whose window closed"""
+        chat_ids = list(digests)
+        total_chats = len(chat_ids)
+
+        batch_size = 3
+        for i in range(0, total_chats, batch_size):
+            batch = chat_ids[i:i + batch_size]
+            for chat_id in batch:
+                await self.send_digest_to_chat(chat_id, digests[chat_id])
+
+            if i + batch_size < total_chats:
+                await asyncio.sleep(3)
+
+        self.prune_dead_chats()
+
+    async def send_digest_to_chat(self, chat_id, items):
+        """Send queued (thumbnail_data, caption) items to a chat as media groups"""
+        if len(items) == 1:
+            thumbnail_data, caption = items[0]
+            await self.send_notification_to_chat(chat_id, thumbnail_data, caption)
+            return
+
+        # Media groups need 2-10 items, so spread the items evenly instead of
+        # leaving a single one for the last group
+        groups = -(-len(items) // MEDIA_GROUP_LIMIT)
+        size, extra = divmod(len(items), groups)
+        start = 0
+        for n in range(groups):
+            end = start + size + (1 if n < extra else 0)
+            chunk, start = items[start:end], end
+            # Each photo keeps its own caption, so every video's link survives
+            await self.deliver(chat_id, lambda target, chunk=chunk: self.bot.send_media_group(
+                chat_id=target,
+                media=[
+                    InputMediaPhoto(media=thumbnail_data, caption=caption, parse_mode=ParseMode.HTML)
+                    for thumbnail_data, caption in chunk
+                ],
+                read_timeout=30,
+                write_timeout=30,
+                connect_timeout=30,
+                pool_timeout=30
+            ))
+
+    async def send_notification_to_chat(self, chat_id, thumbnail_data, caption):
+        """Send notification to a single chat"""
+        await self.deliver(chat_id, lambda target: self.bot.send_photo(
+            chat_id=target,
+            photo=BytesIO(thumbnail_data),
+            caption=caption,
+            parse_mode=ParseMode.HTML,
+            read_timeout=30,
+            write_timeout=30,
+            connect_timeout=30,
+            pool_timeout=30
+        ))
+
+    async def deliver(self, chat_id, send):
+        """
+        Send to a chat through its circuit breaker
 
+        Args:
+            chat_id (int): The chat to send to
+            send (callable): Takes the target chat ID and returns the send coroutine
+        """
+        # Follow migrations that happened while this notification was queued
+        chat_id = self.chat_health.migrations.get(chat_id, chat_id)
+        if not self.chat_health.allow(chat_id):
+            sender_log.debug("Skipping chat with open circuit", extra={'chat_id': chat_id})
+            return
+
+        started = time.perf_counter()
+        network_retries = 1
+        throttle_retries = 3
+        while True:
+            try:
+                await send(chat_id)
+            except Exception as e:
+                outcome = classify(e)
+
+                if outcome == MIGRATED:
+                    sender_log.info(f"Chat migrated to {e.new_chat_id}", extra={'chat_id': chat_id})
+                    self.chat_health.record_migration(chat_id, e.new_chat_id)
+                    self.config.migrate_chat(chat_id, e.new_chat_id)
+                    chat_id = e.new_chat_id
+                    continue
+
+                if outcome == THROTTLED and throttle_retries:
+                    # Capped, a chat that stays rate limited must not stall the rest of the fan-out
+                    throttle_retries -= 1
+                    sender_log.warning(f"Rate limited, waiting {e.retry_after}s", extra={'chat_id': chat_id})
+                    await asyncio.sleep(e.retry_after)
+                    continue
+
+                if outcome == DEAD:
+                    self.chat_health.mark_dead(chat_id, e)
+                    return
+
+                if outcome == TRANSIENT and network_retries:
+                    network_retries -= 1
+                    sender_log.warning("Network error, retrying once", extra={'chat_id': chat_id, 'error': str(e)})
+                    await asyncio.sleep(5)
+                    continue
+
+                self.chat_health.record_failure(chat_id, e)
+                sender_log.error("Failed to send", extra={'chat_id': chat_id, 'error': str(e)})
+                return
+
+            self.chat_health.record_success(chat_id)
+            sender_log.info(
+                "Sent notification",
+                extra={'chat_id': chat_id, 'latency_ms': round((time.perf_counter() - started) * 1000, 1), 'sample': True}
+            )
+            await asyncio.sleep(2)
+            return
+
+    def prune_dead_chats(self):
+        """Remove every chat found dead since the last prune with one config save"""
+        dead = self.chat_health.take_dead()
+        if dead:
+            removed = self.config.remove_chats(dead)
+            sender_log.info(f"Pruned {removed} unreachable chats")
+
+    def on_config_change(self, kind, diff):
+        """Apply a hot-reloaded channels/chats diff without touching unchanged entries"""
+        added, removed, changed = diff['added'], diff['removed'], diff['changed']
+        if not (added or removed or changed):
+            return
+
+        monitor_log.info(
+            f"Reloaded {kind}: {len(added)} added, {len(removed)} removed, {len(changed)} changed"
+        )
+        if kind == 'channels':
+            # New channels are verified on their first check, known ones keep their
+            # cached verification and last check time
+            for channel in removed:
+                monitor_log.info(f"Stopped monitoring {channel.name}", extra={'channel_id': channel.id})
+            self.engine.forget_channels(removed)
+            for channel in added:
+                monitor_log.info(f"Now monitoring {channel.name}", extra={'channel_id': channel.id})
+        else:
+            for chat in removed:
+                monitor_log.info("Stopped notifying chat", extra={'chat_id': chat.id})
+            for chat in added:
+                monitor_log.info("Now notifying chat", extra={'chat_id': chat.id})
+
+    def build_application(self) -> Application:
+        """Create this tenant's Telegram application with every command registered"""
+        application = (
+            Application.builder()
+            .token(self.bot_token)
+            .get_updates_request(build_updates_request())
+            .build()
+        )
+        
+        # Add command handlers
+        application.add_handler(CommandHandler('start_notify', self.cmd_start))
+        application.add_handler(CommandHandler('help_notify', self.cmd_help))
+        application.add_handler(CommandHandler('how_notify', self.cmd_how))
+        application.add_handler(CommandHandler('add_telegram_notify', self.cmd_add))
+        application.add_handler(CommandHandler('remove_notify', self.cmd_remove))
+        application.add_handler(CommandHandler('list_notify', self.cmd_list))
+        application.add_handler(CommandHandler('filter_notify', self.cmd_filter))
+        application.add_handler(CommandHandler('pool_notify', self.cmd_pool))
+        application.add_handler(CommandHandler('profile_notify', self.cmd_profile))
+        application.add_handler(CommandHandler('health_notify', self.cmd_health))
+        
+        # YouTube channel management commands
+        application.add_handler(CommandHandler('add_youtube_channel', self.cmd_add_youtube_channel))
+        application.add_handler(CommandHandler('remove_youtube_channel', self.cmd_remove_youtube_channel))
+        application.add_handler(CommandHandler('list_youtube_channels', self.cmd_list_youtube_channels))
+        
+        application.add_error_handler(self.error_handler)
+
+        return application
+
+
+class DetectionEngine:
+    """
+    Poll every YouTube channel once and fan new videos out to the tenant bots
+
+    Each tenant has its own token, admins and TelegramConfig. The engine owns
+    the YouTube client, channel cache and live tracker, checks the union of
+    the tenants' channels once per cycle and hands each new video to every
+    tenant that follows its channel, so overlapping channel sets cost no
+    extra quota.
+    """
+
+    def __init__(self, data_folder: Path = None, youtube=None):
+        # Records YouTube, thumbnail and Telegram traffic when TRACE_RECORD is set
+        self.recorder = build_recorder()
+        self.youtube = youtube or build(
+            'youtube', 'v3',
+            developerKey=os.getenv('YOUTUBE_API_KEY'),
+            requestBuilder=recording_request_class(self.recorder) if self.recorder else HttpRequest
+        )
+        self.http_trace_configs = [self.recorder.aiohttp_trace_config()] if self.recorder else []
+        self.data_folder = Path(data_folder) if data_folder else Path(__file__).parent / 'Pydata'
+        self.check_interval = int(os.getenv('CHECK_INTERVAL', '300'))
+        self.running = False
+        self.last_check = {}
+        self.shutdown_event = asyncio.Event()
+        self.channel_cache = build_channel_cache(self.data_folder)
+        self.channel_refresh_task = None
+        self.profile_session = None
+        self.live_tracker = build_live_tracker(self.fetch_videos, self.announce_live)
+        self.tenants = []
+        self.background_tasks = []
+
+    def add_tenant(self, tenant):
+        self.tenants.append(tenant)
+
+    def get_youtube_channels(self):
+        """Every tenant's channels, each channel only once"""
+        channels = {}
+        for tenant in self.tenants:
+            for channel in tenant.config.get_youtube_channels():
+                channels.setdefault(channel.id, channel)
+        return list(channels.values())
+
+    def forget_channels(self, channels):
+        """Drop cached state for channels that no tenant follows any more"""
+        forgotten = [
+            channel.id for channel in channels
+            if not any(tenant.config.get_youtube_channel(channel.id) for tenant in self.tenants)
+        ]
+        for channel_id in forgotten:
+            self.channel_cache.forget(channel_id)
+            self.last_check.pop(channel_id, None)
+        if forgotten:
+            self.channel_cache.save()
+
+    def followers(self, video) -> list:
+        """Tenants that follow the video's channel"""
+        channel_id = video['snippet']['channelId']
+        return [tenant for tenant in self.tenants if tenant.config.get_youtube_channel(channel_id)]
+
+    async def dispatch(self, video, thumbnail_data, caption, tenants=None):
+        """Hand a notification to the given tenants, by default every tenant following the video's channel"""
+        if tenants is None:
+            tenants = self.followers(video)
+        # Tenants send through their own bots and pools, so a slow one doesn't hold up the rest
+        results = await asyncio.gather(
+            *(tenant.send_notifications(video, thumbnail_data, caption) for tenant in tenants),
+            return_exceptions=True
+        )
+        for tenant, result in zip(tenants, results):
+            if isinstance(result, Exception):
+                sender_log.error("Error notifying tenant", extra={'tenant': tenant.name, 'error': str(result)})
+
+    async def get_channel_id(self, channel_data):
+        """Get channel ID from channel data if the channel is verified"""
+        channel_id = channel_data.id
+
+        # Stale entries stay usable while the background refresh catches up
+        if self.channel_cache.is_usable(channel_id):
+            return channel_id
+
+        if self.channel_cache.is_suspended(channel_id):
+            monitor_log.debug(f"Channel {channel_data.name} is suspended", extra={'channel_id': channel_id})
+        else:
+            monitor_log.warning(f"Could not verify channel ID for {channel_data.name}", extra={'channel_id': channel_id})
+        return None
+
+    def fetch_channels(self, channel_ids):
+        """Look up metadata for up to 50 channels in one call"""
+        return self.youtube.channels().list(
+            part="snippet,contentDetails",
+            id=",".join(channel_ids),
+            maxResults=len(channel_ids)
+        ).execute().get('items', [])
+
+    def verify_new_channels(self, channels):
+        """Verify channels with no usable metadata before they are checked"""
+        channel_ids = self.channel_cache.needs_verification([c.id for c in channels])
+        if not channel_ids:
+            return
+        try:
+            calls = self.channel_cache.refresh(channel_ids, self.fetch_channels)
+            monitor_log.info(f"Verified {len(channel_ids)} channels with {calls} API calls")
         except Exception as e:
-            print(f"Error verifying channel {channel_data.get('name', 'Unknown')}: {str(e)}")
-            return None
+            monitor_log.error("Error verifying channels", extra={'error': str(e)})
+
+    async def refresh_expired_channels(self, channel_ids):
+        """Refresh stale channel metadata in the background, one batch at a time"""
+        for i in range(0, len(channel_ids), CHANNELS_PER_REQUEST):
+            if self.shutdown_event.is_set():
+                return
+            try:
+                self.channel_cache.refresh(channel_ids[i:i + CHANNELS_PER_REQUEST], self.fetch_channels)
+            except Exception as e:
+                monitor_log.error("Error refreshing channel metadata", extra={'error': str(e)})
+                return
+            # Let channel checks and sends run between batches
+            await asyncio.sleep(1)
+        monitor_log.info(f"Refreshed metadata for {len(channel_ids)} channels")
 
     async def check_channel(self, session, channel_data):
         """Check a YouTube channel for new uploads"""
+        started = time.perf_counter()
         try:
             channel_id = await self.get_channel_id(channel_data)
             if not channel_id:
-                print(f"Skipping channel {channel_data['name']} - could not verify ID {channel_data['id']}")
+                monitor_log.warning(
+                    f"Skipping channel {channel_data.name} - could not verify ID",
+                    extra={'channel_id': channel_data.id}
+                )
                 return
 
             # Get videos after last check
@@ -509,7 +1051,7 @@ class YouTubeTelegramBot:
 
                 video_id = item['contentDetails']['upload']['videoId']
                 video = self.youtube.videos().list(
-                    part="snippet,statistics,contentDetails",
+                    part="snippet,statistics,contentDetails,liveStreamingDetails",
                     id=video_id
                 ).execute()['items'][0]
 
@@ -524,9 +1066,16 @@ class YouTubeTelegramBot:
 
             # Update last check time
             self.last_check[channel_id] = datetime.now(timezone.utc)
+            monitor_log.debug(
+                f"Checked {channel_data.name}: {len(videos_to_process)} new videos",
+                extra={'channel_id': channel_id, 'latency_ms': round((time.perf_counter() - started) * 1000, 1)}
+            )
 
         except Exception as e:
-            print(f"Error checking {channel_data['name']}: {str(e)}")
+            monitor_log.error(
+                f"Error checking {channel_data.name}",
+                extra={'channel_id': channel_data.id, 'error': str(e)}
+            )
             await asyncio.sleep(5)
 
     async def process_video(self, session, video):
@@ -537,112 +1086,105 @@ class YouTubeTelegramBot:
         video_id = video['id']
         title = video['snippet']['title']
         upload_date = datetime.fromisoformat(video['snippet']['publishedAt'].replace('Z', '+00:00'))
+        broadcast = video['snippet'].get('liveBroadcastContent', 'none')
+
+        # Scheduled premieres and streams are announced when they actually start
+        if broadcast == 'upcoming' and (self.live_tracker.is_tracking(video_id) or self.live_tracker.track(video)):
+            return
         
-        # Check for duplicate title within the hour
-        if self.is_duplicate_title(title, upload_date):
-            print(f"Skipping duplicate title within the hour: {title}")
+        # Check for duplicate title within the hour, per tenant so a title only
+        # counts for the bots that actually sent it
+        tenants = [tenant for tenant in self.followers(video) if not tenant.is_duplicate_title(title, upload_date)]
+        if not tenants:
+            monitor_log.info(f"Skipping duplicate title within the hour: {title}", extra={'video_id': video_id})
             return
             
-        thumbnail_url = (
+        thumbnail_data = await self.fetch_thumbnail(session, video)
+        if thumbnail_data is None:
+            return
+
+        if broadcast == 'live':
+            caption = self.build_caption(video, "🔴<b>LIVE NOW</b>🔴", upload_date, "#LiveNow")
+        else:
+            caption = self.build_caption(video, "🔥<b>NEW UPLOAD WATCH NOW</b>🔥", upload_date, "#NewVideo")
+
+        await self.dispatch(video, thumbnail_data, caption, tenants)
+
+    @staticmethod
+    def thumbnail_url(video):
+        """URL of the best available thumbnail"""
+        return (
             video['snippet']['thumbnails'].get('maxres') or 
             video['snippet']['thumbnails'].get('high') or 
             video['snippet']['thumbnails']['default']
         )['url']
 
-        async with session.get(thumbnail_url) as response:
+    async def fetch_thumbnail(self, session, video):
+        """Download the best available thumbnail, returns None on failure"""
+        async with session.get(self.thumbnail_url(video)) as response:
             if response.status != 200:
-                return
-            thumbnail_data = await response.read()
+                return None
+            return await response.read()
 
-        duration = video['contentDetails']['duration'].replace('PT','').lower()
-        duration = duration.replace('h', ':').replace('m', ':').replace('s', '')
-        
-        formatted_date = upload_date.strftime('%Y-%m-%d %H:%M UTC')
+    def build_caption(self, video, header, date, hashtag):
+        """Build the HTML notification caption for a video"""
+        video_id = video['id']
+        title = video['snippet']['title']
+        formatted_date = date.strftime('%Y-%m-%d %H:%M UTC')
 
-        caption = (
-            f"🔥<b>NEW UPLOAD WATCH NOW</b>🔥\n"
+        return (
+            f"{header}\n"
             f"═══════════════\n"
             f"🎬 <b><a href='https://youtube.com/watch?v={video_id}'>{title}</a></b>\n"
             f"📺 <b><a href='https://youtube.com/channel/{video['snippet']['channelId']}?sub_confirmation=1'>{video['snippet']['channelTitle']}</a></b>\n"
             f"📅 {formatted_date}\n"
-            f"#NewVideo #{video['snippet']['channelTitle'].replace(' ', '')}"
+            f"{hashtag} #{video['snippet']['channelTitle'].replace(' ', '')}"
         )
 
-        await self.send_notifications(thumbnail_data, caption)
+    def fetch_videos(self, video_ids):
+        """Look up live status for up to 50 videos in one call"""
+        return self.youtube.videos().list(
+            part="snippet,liveStreamingDetails",
+            id=",".join(video_ids),
+            maxResults=len(video_ids)
+        ).execute().get('items', [])
 
-    async def send_notifications(self, thumbnail_data, caption):
-        """Send notifications to all configured Telegram chats"""
-        chat_ids = self.config.get_telegram_chats()
-        total_chats = len(chat_ids)
-        
-        batch_size = 3
-        for i in range(0, total_chats, batch_size):
-            if self.shutdown_event.is_set():
-                return
-                
-            batch = chat_ids[i:i + batch_size]
-            for chat_id in batch:
-                await self.send_notification_to_chat(chat_id, thumbnail_data, caption)
-            
-            if i + batch_size < total_chats:
-                await asyncio.sleep(3)
+    async def announce_live(self, video):
+        """Send a live now notification for a tracked broadcast that just started"""
+        if self.shutdown_event.is_set():
+            return
 
-    async def send_notification_to_chat(self, chat_id, thumbnail_data, caption):
-        """Send notification to a single chat"""
-        try:
-            await self.bot.send_photo(
-                chat_id=chat_id,
-                photo=BytesIO(thumbnail_data),
-                caption=caption,
-                parse_mode=ParseMode.HTML,
-                read_timeout=30,
-                write_timeout=30,
-                connect_timeout=30,
-                pool_timeout=30
-            )
-            print(f"✅ Sent notification to chat {chat_id}")
-            await asyncio.sleep(2)
-            
-        except Exception as e:
-            error_message = str(e).lower()
-            if "chat not found" in error_message or "bot was blocked" in error_message:
-                print(f"❌ Chat {chat_id} not accessible (will be removed): {str(e)}")
-                self.config.remove_telegram_chat(chat_id)
-                return
-            
-            if "timeout" in error_message or "connection" in error_message:
-                print(f"⚠️ Network error for chat {chat_id}, retrying once: {str(e)}")
-                await asyncio.sleep(5)
-                try:
-                    await self.bot.send_photo(
-                        chat_id=chat_id,
-                        photo=BytesIO(thumbnail_data),
-                        caption=caption,
-                        parse_mode=ParseMode.HTML,
-                        read_timeout=30,
-                        write_timeout=30,
-                        connect_timeout=30,
-                        pool_timeout=30
-                    )
-                    print(f"✅ Retry successful for chat {chat_id}")
-                except Exception as retry_e:
-                    print(f"❌ Retry failed for chat {chat_id}: {str(retry_e)}")
-            else:
-                print(f"❌ Failed to send to chat {chat_id}: {str(e)}")
+        started_at = parse_time(video['liveStreamingDetails']['actualStartTime'])
+        timeout = aiohttp.ClientTimeout(total=60)
+        async with aiohttp.ClientSession(timeout=timeout, trace_configs=self.http_trace_configs) as session:
+            thumbnail_data = await self.fetch_thumbnail(session, video)
+        if thumbnail_data is None:
+            return
+
+        caption = self.build_caption(video, "🔴<b>LIVE NOW</b>🔴", started_at, "#LiveNow")
+        await self.dispatch(video, thumbnail_data, caption)
 
     async def monitor_channels(self):
         """Main monitoring loop"""
         self.running = True
         while not self.shutdown_event.is_set():
             try:
-                channels = self.config.get_youtube_channels()
-                print(f"\nChecking {len(channels)} channels at {datetime.now()}")
-                print("Channels to check:", ", ".join(c['name'] for c in channels))
+                channels = self.get_youtube_channels()
+                cycle_started = time.perf_counter()
+                monitor_log.info(f"Checking {len(channels)} channels")
+                monitor_log.debug("Channels to check: " + ", ".join(c.name for c in channels))
+
+                self.verify_new_channels(channels)
+                expired = self.channel_cache.expired([c.id for c in channels])
+                if expired and (self.channel_refresh_task is None or self.channel_refresh_task.done()):
+                    self.channel_refresh_task = asyncio.create_task(self.refresh_expired_channels(expired))
 
                 conn = aiohttp.TCPConnector(limit=5, force_close=True)
                 timeout = aiohttp.ClientTimeout(total=60)
                 
-                async with aiohttp.ClientSession(connector=conn, timeout=timeout) as session:
+                async with aiohttp.ClientSession(
+                    connector=conn, timeout=timeout, trace_configs=self.http_trace_configs
+                ) as session:
                     tasks = []
                     for channel_data in channels:
                         if self.shutdown_event.is_set():
@@ -657,7 +1199,20 @@ class YouTubeTelegramBot:
                 if self.shutdown_event.is_set():
                     break
 
-                print("\nWaiting for next check...")
+                monitor_log.info(
+                    "Check cycle finished",
+                    extra={'latency_ms': round((time.perf_counter() - cycle_started) * 1000, 1)}
+                )
+                for tenant in self.tenants:
+                    metrics = tenant.notify_request.get_metrics()
+                    pool_log.info(
+                        f"Notification pool: peak {metrics['peak_in_flight']}/{metrics['pool_size']} "
+                        f"({metrics['peak_saturation']:.0%}), pool timeouts: {metrics['pool_timeouts']}",
+                        extra={'tenant': tenant.name}
+                    )
+                    tenant.notify_request.reset_peak()
+
+                monitor_log.debug("Waiting for next check...")
                 try:
                     await asyncio.wait_for(
                         self.shutdown_event.wait(), 
@@ -667,38 +1222,30 @@ class YouTubeTelegramBot:
                     pass
 
             except Exception as e:
-                print(f"Monitor error: {str(e)}")
+                monitor_log.error("Monitor error", extra={'error': str(e)})
                 await asyncio.sleep(30)
 
-        print("Monitor stopped cleanly")
+        monitor_log.info("Monitor stopped cleanly")
         self.running = False
 
     async def run(self):
-        """Run both the monitor and Telegram bot"""
-        application = Application.builder().token(self.bot_token).build()
-        
-        # Add command handlers
-        application.add_handler(CommandHandler('start_notify', self.cmd_start))
-        application.add_handler(CommandHandler('help_notify', self.cmd_help))
-        application.add_handler(CommandHandler('how_notify', self.cmd_how))
-        application.add_handler(CommandHandler('add_telegram_notify', self.cmd_add))
-        application.add_handler(CommandHandler('remove_notify', self.cmd_remove))
-        application.add_handler(CommandHandler('list_notify', self.cmd_list))
-        
-        # YouTube channel management commands
-        application.add_handler(CommandHandler('add_youtube_channel', self.cmd_add_youtube_channel))
-        application.add_handler(CommandHandler('remove_youtube_channel', self.cmd_remove_youtube_channel))
-        application.add_handler(CommandHandler('list_youtube_channels', self.cmd_list_youtube_channels))
-        
-        application.add_error_handler(self.error_handler)
+        """Run the monitor and every tenant's Telegram bot"""
+        if self.recorder:
+            self.recorder.record_config(self.tenants, self.channel_cache)
+        applications = [tenant.build_application() for tenant in self.tenants]
 
-        # Start application and monitoring
-        async with application:
-            await application.initialize()
-            await application.start()
-            await application.updater.start_polling()
+        # Start applications and monitoring
+        async with contextlib.AsyncExitStack() as stack:
+            for application in applications:
+                await stack.enter_async_context(application)
+                await application.start()
+                await application.updater.start_polling()
 
             monitor_task = asyncio.create_task(self.monitor_channels())
+            for tenant in self.tenants:
+                watcher = build_config_watcher(tenant.config, tenant.on_config_change)
+                self.start_background_task(watcher.run(self.shutdown_event), f"config watcher ({tenant.name})")
+            self.start_background_task(self.live_tracker.run(self.shutdown_event), "live tracker")
 
             # Set up signal handlers
             if platform.system() != 'Windows':
@@ -706,14 +1253,14 @@ class YouTubeTelegramBot:
                 for sig in (signal.SIGTERM, signal.SIGINT):
                     loop.add_signal_handler(
                         sig,
-                        lambda s=sig: asyncio.create_task(self.handle_shutdown(application, monitor_task, s))
+                        lambda s=sig: asyncio.create_task(self.handle_shutdown(applications, monitor_task, s))
                     )
             else:
                 for sig in (signal.SIGTERM, signal.SIGINT):
                     signal.signal(
                         sig,
-                        lambda s, f, app=application, task=monitor_task: 
-                            asyncio.create_task(self.handle_shutdown(app, task, s))
+                        lambda s, f, apps=applications, task=monitor_task: 
+                            asyncio.create_task(self.handle_shutdown(apps, task, s))
                     )
 
             try:
@@ -721,20 +1268,54 @@ class YouTubeTelegramBot:
             except asyncio.CancelledError:
                 pass
 
-    async def handle_shutdown(self, application, monitor_task, sig):
+    def start_background_task(self, coro, name: str) -> asyncio.Task:
+        """Start a task that runs until shutdown, logging it if it dies early"""
+        task = asyncio.create_task(coro, name=name)
+        self.background_tasks.append(task)
+        task.add_done_callback(self.on_background_task_done)
+        return task
+
+    def on_background_task_done(self, task: asyncio.Task):
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            monitor_log.error(f"Background task {task.get_name()} crashed", extra={'error': repr(task.exception())})
+        elif not self.shutdown_event.is_set():
+            monitor_log.warning(f"Background task {task.get_name()} stopped before shutdown")
+
+    async def handle_shutdown(self, applications, monitor_task, sig):
         """Handle shutdown signal"""
-        print(f"\nReceived signal {sig}")
+        monitor_log.info(f"Received signal {sig}")
         self.shutdown_event.set()
         monitor_task.cancel()
-        await application.stop()
-        await application.shutdown()
+        for task in self.background_tasks:
+            task.cancel()
+        await asyncio.gather(*self.background_tasks, return_exceptions=True)
+        for tenant in self.tenants:
+            await tenant.coalescer.flush_all()
+        for application in applications:
+            await application.stop()
+            await application.shutdown()
         sys.exit(0)
 
 async def main():
-    bot = YouTubeTelegramBot()
-    bot.config.list_all()
-    await bot.run()
+    engine = DetectionEngine()
+    # BOT_TENANTS=brand_a,brand_b hosts several bots, otherwise a single one from the plain settings
+    names = [name.strip() for name in os.getenv('BOT_TENANTS', '').split(',') if name.strip()]
+    for name in names or [None]:
+        bot = YouTubeTelegramBot(engine, name)
+        bot.config.list_all()
+    try:
+        await engine.run()
+    finally:
+        if engine.recorder:
+            engine.recorder.close()
 
 if __name__ == "__main__":
-    print("Starting YouTube Monitor and Telegram Bot...")
-    asyncio.run(main())
\ No newline at end of file
+    log_listener = setup_logging()
+    monitor_log.info("Starting YouTube Monitor and Telegram Bot...")
+    try:
+        asyncio.run(main())
+    finally:
+        # Flush whatever is still queued before the process exits
+        log_listener.stop()
\ No newline at end of file
@@ -0,0 +1,113 @@
+"""
+Memory benchmark for the chat/channel configuration
+
+Compares the old representation (lists of plain dicts straight from
+json.load) with TelegramConfig's slotted records at 100k chats and 10k
+channels. Each variant runs in its own subprocess so RSS is not shared.
+
+Usage:
+    python benchmarks/config_memory.py [chats] [channels]
+"""
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def rss_kb() -> int:
+    """Current resident set size in KB"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (FileNotFoundError, ValueError):
+        # Peak RSS is the best we have without /proc (KB on Linux, bytes on macOS)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def write_data(folder: Path, chats: int, channels: int):
+    chat_types = ('supergroup', 'channel', 'group')
+    with open(folder / 'telegram_chats.json', 'w') as f:
+        json.dump([
+            {
+                'id': -1001000000000 - i,
+                'title': f"Chat number {i}",
+                'type': chat_types[i % len(chat_types)],
+                'added_at': f"2025-01-{i % 28 + 1:02d} 12:{i % 60:02d}:{i % 60:02d}",
+            }
+            for i in range(chats)
+        ], f)
+    with open(folder / 'influencers.json', 'w') as f:
+        json.dump({'channels': [
+            {'name': f"channel{i}", 'id': f"UC{i:022d}"}
+            for i in range(channels)
+        ]}, f)
+
+
+def measure(mode: str, folder: Path):
+    # Import up front in both modes so module code isn't counted as data
+    from telegram_config import TelegramConfig
+    gc.collect()
+    before = rss_kb()
+
+    if mode == 'dicts':
+        with open(folder / 'telegram_chats.json') as f:
+            chats = json.load(f)
+        with open(folder / 'influencers.json') as f:
+            channels = json.load(f)['channels']
+        get_ids = lambda: [chat['id'] for chat in chats]
+        keep = (chats, channels)
+    else:
+        config = TelegramConfig(folder)
+        get_ids = config.get_chat_ids
+        keep = config
+
+    gc.collect()
+    after = rss_kb()
+
+    # Simulate send_notifications asking for the chat IDs once per video
+    started = time.perf_counter()
+    for _ in range(100):
+        ids = get_ids()
+    per_call_us = (time.perf_counter() - started) / 100 * 1e6
+
+    print(json.dumps({'mode': mode, 'rss_kb': after - before, 'get_ids_us': round(per_call_us, 1), 'ids': len(ids)}))
+    del keep
+
+
+def main():
+    chats = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    channels = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        write_data(folder, chats, channels)
+
+        results = {}
+        for mode in ('dicts', 'records'):
+            output = subprocess.run(
+                [sys.executable, __file__, '--measure', mode, str(folder)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    old, new = results['dicts'], results['records']
+    print(f"{chats} chats, {channels} channels")
+    print(f"{'':10} {'RSS (MB)':>10} {'get_chat_ids (us)':>20}")
+    for mode in ('dicts', 'records'):
+        print(f"{mode:10} {results[mode]['rss_kb'] / 1024:10.1f} {results[mode]['get_ids_us']:20.1f}")
+    print(f"RSS reduction: {(1 - new['rss_kb'] / old['rss_kb']) * 100:.0f}%")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--measure':
+        measure(sys.argv[2], Path(sys.argv[3]))
+    else:
+        main()
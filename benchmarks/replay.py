@@ -0,0 +1,239 @@
+"""
+Replay a recorded traffic trace through the bot without a network
+
+Record a trace by running the bot with TRACE_RECORD=trace.jsonl.gz, then
+replay it here. YouTube API calls are answered from the trace through the
+API client's request class, Telegram calls through an httpx mock transport
+behind the real NotificationRequest (so pool metrics still apply) and
+thumbnails from their recorded sizes. Recorded latencies are kept, and with
+--speed above 1 the event loop clock runs faster, so every sleep, check
+interval and coalescing window shrinks with it.
+
+Latency is measured from the first videos.list response that returned a
+video to each delivery that mentions it.
+
+Usage:
+    python benchmarks/replay.py trace.jsonl.gz [--speed 10] [--duration 600]
+        [--expect-deliveries N] [--min-deliveries N] [--max-p95 SECONDS]
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import re
+import selectors
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import httpx
+from googleapiclient.discovery import build
+
+from bot_logging import setup_logging
+from telegram_config import TelegramConfig
+from telegram_request import build_notification_request
+from traffic_trace import Trace, parse_telegram_request, replay_request_class, synthetic_result
+
+VIDEO_LINK = re.compile(r'watch\?v=([\w-]+)')
+DELIVERY_ENDPOINTS = ('sendPhoto', 'sendMediaGroup')
+
+
+class ScaledSelector(selectors.DefaultSelector):
+    """Selector that waits speed times shorter than asked"""
+
+    def __init__(self, speed: float):
+        super().__init__()
+        self.speed = speed
+
+    def select(self, timeout=None):
+        return super().select(timeout / self.speed if timeout else timeout)
+
+
+class AcceleratedEventLoop(asyncio.SelectorEventLoop):
+    """Event loop whose clock runs speed times faster than the wall clock"""
+
+    def __init__(self, speed: float):
+        super().__init__(ScaledSelector(speed))
+        self.speed = speed
+        self.started = time.monotonic()
+
+    def time(self):
+        return self.started + (time.monotonic() - self.started) * self.speed
+
+
+def load_bot_module():
+    """Import YT-BOT.py, its file name is not a valid module name"""
+    spec = importlib.util.spec_from_file_location('yt_bot', ROOT / 'YT-BOT.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(values: list, pct: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class Replay:
+    def __init__(self, trace: Trace, speed: float):
+        self.trace = trace
+        self.speed = speed
+        self.loop = None
+        self.engine = None
+        self.first_seen = {}
+        self.latencies = []
+        self.deliveries = 0
+        self.failed = 0
+        self.unmatched = 0
+        self.pools = []
+
+    def on_youtube_response(self, method_id: str, body: dict):
+        if method_id != 'youtube.videos.list':
+            return
+        now = self.loop.time()
+        for video in body.get('items', []):
+            # Upcoming broadcasts are delivered when they go live, time them from then
+            if video.get('snippet', {}).get('liveBroadcastContent') != 'upcoming':
+                self.first_seen.setdefault(video['id'], now)
+
+    async def handle_telegram(self, request: httpx.Request) -> httpx.Response:
+        sent = parse_telegram_request(request)
+        event = self.trace.take(self.trace.telegram, (sent.endpoint, sent.chat_id))
+        if event is None:
+            self.unmatched += 1
+            status, body = 200, json.dumps(synthetic_result(sent.endpoint, sent.chat_id))
+        else:
+            await asyncio.sleep(event['elapsed'])
+            status, body = event['status'], event['body']
+
+        if sent.endpoint in DELIVERY_ENDPOINTS:
+            if status != 200:
+                self.failed += 1
+            else:
+                now = self.loop.time()
+                for video_id in VIDEO_LINK.findall(sent.text):
+                    self.deliveries += 1
+                    if video_id in self.first_seen:
+                        self.latencies.append(now - self.first_seen[video_id])
+        return httpx.Response(status, content=body.encode('utf-8'))
+
+    async def fetch_thumbnail(self, session, video):
+        event = self.trace.take(self.trace.thumbnails, self.engine.thumbnail_url(video))
+        if event is None:
+            return bytes(1024)
+        await asyncio.sleep(event['elapsed'])
+        return bytes(event['size']) if event['status'] == 200 else None
+
+    def write_config(self, folder: Path) -> list:
+        """Recreate each tenant's data folder and the shared channel cache, returns the tenant names"""
+        config = self.trace.config or {'tenants': [], 'channel_cache': {}}
+        for tenant in config['tenants']:
+            tenant_folder = folder / tenant['name']
+            tenant_folder.mkdir()
+            with open(tenant_folder / 'telegram_chats.json', 'w') as f:
+                json.dump(tenant['chats'], f)
+            with open(tenant_folder / 'influencers.json', 'w') as f:
+                json.dump({'channels': tenant['channels']}, f)
+
+        # Fresh timestamps, an expired entry would trigger refreshes the trace never saw
+        cache = config['channel_cache']
+        for entry in cache.values():
+            entry['checked_at'] = time.time()
+        with open(folder / 'channel_cache.json', 'w') as f:
+            json.dump(cache, f)
+        return [tenant['name'] for tenant in config['tenants']]
+
+    async def run(self, bot_module, duration: float):
+        self.loop = asyncio.get_running_loop()
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp)
+            names = self.write_config(folder)
+
+            youtube = build(
+                'youtube', 'v3',
+                developerKey='replay',
+                requestBuilder=replay_request_class(self.trace, self.speed, self.on_youtube_response),
+                static_discovery=True
+            )
+            self.engine = bot_module.DetectionEngine(data_folder=folder, youtube=youtube)
+            self.engine.fetch_thumbnail = self.fetch_thumbnail
+            for name in names:
+                bot_module.YouTubeTelegramBot(
+                    self.engine,
+                    name,
+                    config=TelegramConfig(folder / name),
+                    notify_request=build_notification_request(transport=httpx.MockTransport(self.handle_telegram)),
+                    bot_token='0:replay'
+                )
+
+            monitor_task = asyncio.create_task(self.engine.monitor_channels())
+            live_task = asyncio.create_task(self.engine.live_tracker.run(self.engine.shutdown_event))
+            await asyncio.sleep(duration)
+
+            self.engine.shutdown_event.set()
+            await asyncio.gather(monitor_task, live_task, return_exceptions=True)
+            for tenant in self.engine.tenants:
+                await tenant.coalescer.flush_all()
+                self.pools.append(tenant.notify_request.get_metrics())
+                await tenant.notify_request.shutdown()
+
+    def report(self) -> dict:
+        return {
+            'deliveries': self.deliveries,
+            'failed': self.failed,
+            'unmatched_telegram': self.unmatched,
+            'p50_s': percentile(self.latencies, 50),
+            'p95_s': percentile(self.latencies, 95),
+            'max_s': max(self.latencies, default=None),
+            # monitor_channels resets the per-cycle peak, so use the all-time one
+            'pool_peak': max((pool['max_in_flight'] for pool in self.pools), default=None),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded traffic trace offline")
+    parser.add_argument('trace', help="Trace file written with TRACE_RECORD")
+    parser.add_argument('--speed', type=float, default=1.0, help="Clock speed-up, 1 replays in real time")
+    parser.add_argument('--duration', type=float, help="Seconds of bot time to replay, defaults to the trace length")
+    parser.add_argument('--expect-deliveries', type=int, help="Fail unless exactly this many deliveries happen")
+    parser.add_argument('--min-deliveries', type=int, help="Fail if fewer deliveries happen")
+    parser.add_argument('--max-p95', type=float, help="Fail if p95 detection-to-delivery latency exceeds this (s)")
+    args = parser.parse_args()
+
+    # Read when the engine is built, a replay must never record itself
+    os.environ['TRACE_RECORD'] = ''
+
+    log_listener = setup_logging()
+    trace = Trace(args.trace)
+    replay = Replay(trace, args.speed)
+    loop = AcceleratedEventLoop(args.speed)
+    try:
+        loop.run_until_complete(replay.run(load_bot_module(), args.duration or trace.duration))
+    finally:
+        loop.close()
+        log_listener.stop()
+
+    report = replay.report()
+    print(json.dumps(report, indent=2))
+
+    failures = []
+    if args.expect_deliveries is not None and report['deliveries'] != args.expect_deliveries:
+        failures.append(f"expected {args.expect_deliveries} deliveries, got {report['deliveries']}")
+    if args.min_deliveries is not None and report['deliveries'] < args.min_deliveries:
+        failures.append(f"expected at least {args.min_deliveries} deliveries, got {report['deliveries']}")
+    if args.max_p95 is not None and (report['p95_s'] is None or report['p95_s'] > args.max_p95):
+        failures.append(f"p95 latency {report['p95_s']} exceeds {args.max_p95}s")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
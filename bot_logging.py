@@ -0,0 +1,95 @@
+import json
+import logging
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Extra fields copied into every JSON log line when present on the record
+CONTEXT_FIELDS = ('tenant', 'channel_id', 'video_id', 'chat_id', 'latency_ms', 'error')
+
+
+class JsonFormatter(logging.Formatter):
+    """Format log records as one JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Only pass 1 in N records marked with extra={'sample': True}"""
+
+    def __init__(self, rate: int):
+        super().__init__()
+        self.rate = max(rate, 1)
+        self.counts = {}
+
+    def filter(self, record):
+        if not getattr(record, 'sample', False) or self.rate == 1:
+            return True
+        # Count per call site so a noisy message doesn't starve a quiet one
+        key = (record.name, record.msg)
+        count = self.counts.get(key, 0)
+        self.counts[key] = count + 1
+        return count % self.rate == 0
+
+
+def parse_levels(spec: str) -> dict:
+    """Parse 'monitor=DEBUG,sender=WARNING' into {'ytbot.monitor': 'DEBUG', ...}"""
+    levels = {}
+    for item in spec.split(','):
+        if '=' not in item:
+            continue
+        name, level = item.split('=', 1)
+        levels[f"ytbot.{name.strip()}"] = level.strip().upper()
+    return levels
+
+
+def setup_logging() -> QueueListener:
+    """
+    Route all logging through a queue drained by a background thread
+
+    The event loop only puts records on the queue, the listener thread does
+    the formatting and the blocking writes to stdout.
+
+    Returns:
+        QueueListener: The running listener, stop() it on shutdown to flush
+    """
+    log_queue = queue.SimpleQueue()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if os.getenv('LOG_FORMAT', 'json').lower() == 'json':
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    queue_handler = QueueHandler(log_queue)
+    # Filter before enqueueing so dropped samples never cost a queue put
+    queue_handler.addFilter(SamplingFilter(int(os.getenv('LOG_SAMPLE_RATE', '1'))))
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+
+    for name, level in parse_levels(os.getenv('LOG_LEVELS', '')).items():
+        logging.getLogger(name).setLevel(level)
+
+    # Library chatter (httpx logs every request at INFO) stays at WARNING
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    return listener
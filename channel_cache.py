@@ -0,0 +1,141 @@
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+log = logging.getLogger('ytbot.channels')
+
+# channels.list accepts at most 50 IDs per call
+CHANNELS_PER_REQUEST = 50
+
+STATUS_OK = 'ok'
+STATUS_MISSING = 'missing'
+STATUS_SUSPENDED = 'suspended'
+
+
+class ChannelMetadataCache:
+    """
+    Persisted channel metadata (title, uploads playlist, status) with a TTL
+
+    Verified channels survive restarts, so they are not re-verified one by one
+    on startup. Entries past their TTL are refreshed in batches, and channels
+    that fail verification max_failures times in a row are suspended.
+    """
+
+    def __init__(self, cache_file: Path, ttl: float = 86400, max_failures: int = 3):
+        self.cache_file = Path(cache_file)
+        self.ttl = ttl
+        self.max_failures = max_failures
+        self.entries = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.cache_file, 'r') as f:
+                self.entries = json.load(f)
+            log.info(f"Loaded metadata for {len(self.entries)} channels from {self.cache_file}")
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+
+    def save(self):
+        # Write to a temp file first so a crash never leaves a truncated cache
+        tmp_file = self.cache_file.with_suffix('.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_file, self.cache_file)
+
+    def get(self, channel_id: str) -> dict:
+        return self.entries.get(channel_id)
+
+    def is_usable(self, channel_id: str) -> bool:
+        """A channel verified at some point and not suspended, even if its entry is stale"""
+        entry = self.entries.get(channel_id)
+        return entry is not None and entry['status'] == STATUS_OK
+
+    def is_suspended(self, channel_id: str) -> bool:
+        entry = self.entries.get(channel_id)
+        return entry is not None and entry['status'] == STATUS_SUSPENDED
+
+    def is_expired(self, entry: dict, now: float) -> bool:
+        return now - entry['checked_at'] > self.ttl
+
+    def needs_verification(self, channel_ids) -> list:
+        """Channels that must be verified before they can be checked"""
+        return [
+            channel_id for channel_id in channel_ids
+            if channel_id not in self.entries or self.entries[channel_id]['status'] == STATUS_MISSING
+        ]
+
+    def expired(self, channel_ids) -> list:
+        """Known channels whose metadata is past its TTL"""
+        now = time.time()
+        return [
+            channel_id for channel_id in channel_ids
+            if channel_id in self.entries and self.is_expired(self.entries[channel_id], now)
+        ]
+
+    def record_verified(self, channel_id: str, item: dict):
+        """Store metadata from a channels.list item and clear any failures"""
+        title = item['snippet']['title']
+        previous = self.entries.get(channel_id)
+        if previous and previous.get('title') and previous['title'] != title:
+            log.info(f"Channel renamed from {previous['title']!r} to {title!r}", extra={'channel_id': channel_id})
+        self.entries[channel_id] = {
+            'title': title,
+            'uploads_playlist': item.get('contentDetails', {}).get('relatedPlaylists', {}).get('uploads'),
+            'status': STATUS_OK,
+            'failures': 0,
+            'checked_at': time.time(),
+        }
+
+    def record_failure(self, channel_id: str):
+        """Count a failed verification, suspending the channel after too many"""
+        entry = self.entries.get(channel_id) or {'title': None, 'uploads_playlist': None, 'failures': 0}
+        entry['failures'] += 1
+        entry['checked_at'] = time.time()
+        entry['status'] = STATUS_SUSPENDED if entry['failures'] >= self.max_failures else STATUS_MISSING
+        self.entries[channel_id] = entry
+        if entry['status'] == STATUS_SUSPENDED:
+            log.warning(
+                f"Suspending channel after {entry['failures']} failed verifications",
+                extra={'channel_id': channel_id}
+            )
+
+    def forget(self, channel_id: str):
+        self.entries.pop(channel_id, None)
+
+    def refresh(self, channel_ids, fetch_channels) -> int:
+        """
+        Verify channels in batches of 50
+
+        Args:
+            channel_ids (list): Channels to verify
+            fetch_channels (callable): Takes a list of IDs, returns channels.list items
+
+        Returns:
+            int: Number of channels.list calls made
+        """
+        calls = 0
+        for i in range(0, len(channel_ids), CHANNELS_PER_REQUEST):
+            batch = channel_ids[i:i + CHANNELS_PER_REQUEST]
+            # Errors propagate, a failed request says nothing about the channels themselves
+            items = {item['id']: item for item in fetch_channels(batch)}
+            calls += 1
+            for channel_id in batch:
+                if channel_id in items:
+                    self.record_verified(channel_id, items[channel_id])
+                else:
+                    self.record_failure(channel_id)
+        if calls:
+            self.save()
+        return calls
+
+
+def build_channel_cache(data_folder: Path) -> ChannelMetadataCache:
+    """Create a ChannelMetadataCache in the data folder from environment settings"""
+    return ChannelMetadataCache(
+        Path(data_folder) / 'channel_cache.json',
+        ttl=float(os.getenv('CHANNEL_CACHE_TTL', '86400')),
+        max_failures=int(os.getenv('CHANNEL_MAX_FAILURES', '3')),
+    )
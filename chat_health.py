@@ -0,0 +1,133 @@
+import logging
+import os
+import time
+from telegram.error import BadRequest, ChatMigrated, Forbidden, NetworkError, RetryAfter, TimedOut
+
+log = logging.getLogger('ytbot.health')
+
+# Outcomes of a failed send, decided by the python-telegram-bot exception type
+DEAD = 'dead'            # The bot can never post there again
+MIGRATED = 'migrated'    # Group became a supergroup with a new ID
+THROTTLED = 'throttled'  # Flood control, wait and retry, not the chat's fault
+TRANSIENT = 'transient'  # Network trouble, worth one retry
+FAILED = 'failed'        # Anything else, counts towards the circuit
+
+# BadRequest covers both bad messages and gone chats, these descriptions mean the chat is gone
+DEAD_CHAT_ERRORS = (
+    'chat not found',
+    'group chat was deactivated',
+)
+
+
+def classify(error: Exception) -> str:
+    """Map a send exception to how the chat's health should change"""
+    if isinstance(error, ChatMigrated):
+        return MIGRATED
+    if isinstance(error, RetryAfter):
+        return THROTTLED
+    if isinstance(error, Forbidden):
+        return DEAD
+    if isinstance(error, BadRequest):
+        # Checked before NetworkError, BadRequest subclasses it
+        message = error.message.lower()
+        return DEAD if any(text in message for text in DEAD_CHAT_ERRORS) else FAILED
+    if isinstance(error, (TimedOut, NetworkError)):
+        return TRANSIENT
+    return FAILED
+
+
+class ChatState:
+    __slots__ = ('failures', 'open_until', 'cooldown', 'last_error')
+
+    def __init__(self):
+        self.failures = 0
+        self.open_until = 0.0
+        self.cooldown = 0.0
+        self.last_error = None
+
+
+class ChatHealthTracker:
+    """
+    Per-chat circuit breaker plus a queue of dead chats to prune
+
+    After failure_threshold failures in a row a chat's circuit opens and
+    sends to it are skipped for a cooldown that doubles on every re-open, up
+    to max_cooldown. When the cooldown ends one send is let through; success
+    closes the circuit. Chats classified as dead are collected and pruned
+    from the config in one go.
+    """
+
+    def __init__(self, failure_threshold: int = 3, base_cooldown: float = 600, max_cooldown: float = 21600):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.states = {}
+        self.dead = {}
+        self.pruned = {}
+        self.migrations = {}
+
+    def allow(self, chat_id) -> bool:
+        """Whether a send to this chat should be attempted now"""
+        if chat_id in self.dead:
+            return False
+        state = self.states.get(chat_id)
+        return state is None or state.open_until <= time.monotonic()
+
+    def record_success(self, chat_id):
+        state = self.states.get(chat_id)
+        if state is None:
+            return
+        if state.open_until:
+            log.info("Circuit closed", extra={'chat_id': chat_id})
+        # A healthy chat needs no state at all
+        del self.states[chat_id]
+
+    def record_failure(self, chat_id, error: Exception):
+        state = self.states.setdefault(chat_id, ChatState())
+        state.failures += 1
+        state.last_error = f"{type(error).__name__}: {error}"
+        if state.failures >= self.failure_threshold:
+            state.cooldown = min(max(state.cooldown * 2, self.base_cooldown), self.max_cooldown)
+            state.open_until = time.monotonic() + state.cooldown
+            log.warning(
+                f"Circuit opened for {state.cooldown:.0f}s after {state.failures} failures",
+                extra={'chat_id': chat_id, 'error': state.last_error}
+            )
+
+    def mark_dead(self, chat_id, error: Exception):
+        self.dead[chat_id] = f"{type(error).__name__}: {error}"
+        self.states.pop(chat_id, None)
+        log.warning("Chat is no longer reachable, queued for removal", extra={'chat_id': chat_id, 'error': self.dead[chat_id]})
+
+    def record_migration(self, old_chat_id, new_chat_id):
+        self.migrations[old_chat_id] = new_chat_id
+        state = self.states.pop(old_chat_id, None)
+        if state is not None:
+            self.states[new_chat_id] = state
+
+    def take_dead(self) -> list:
+        """Hand over the dead chats collected so far for a bulk removal"""
+        dead = list(self.dead)
+        self.pruned.update(self.dead)
+        self.dead.clear()
+        return dead
+
+    def summary(self) -> dict:
+        now = time.monotonic()
+        open_chats = {chat_id: s for chat_id, s in self.states.items() if s.open_until > now}
+        return {
+            'open': open_chats,
+            'degraded': {chat_id: s for chat_id, s in self.states.items() if chat_id not in open_chats},
+            'dead': dict(self.dead),
+            'pruned': dict(self.pruned),
+            'migrations': dict(self.migrations),
+        }
+
+
+def build_chat_health() -> ChatHealthTracker:
+    """Create a ChatHealthTracker from environment settings"""
+    return ChatHealthTracker(
+        failure_threshold=int(os.getenv('CHAT_FAILURE_THRESHOLD', '3')),
+        base_cooldown=float(os.getenv('CHAT_CIRCUIT_COOLDOWN', '600')),
+        max_cooldown=float(os.getenv('CHAT_CIRCUIT_MAX_COOLDOWN', '21600')),
+    )
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import os
+
+log = logging.getLogger('ytbot.coalescer')
+
+# Telegram accepts at most 10 items in one media group
+MEDIA_GROUP_LIMIT = 10
+
+
+class NotificationCoalescer:
+    """
+    Hold notifications per chat for a short window and deliver them together
+
+    The first notification queued for a chat opens that chat's window. When
+    it expires, everything queued for the chat in the meantime is handed to
+    the flush callback in one go. Windows that expire together are flushed in
+    the same call, so the sender can keep pacing its batches.
+    """
+
+    def __init__(self, window: float, flush):
+        self.window = window
+        self.flush = flush
+        self.pending = {}
+        self.deadlines = {}
+        self.flusher = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def add(self, chat_id, item):
+        """Queue an item for a chat, opening its window if needed"""
+        if chat_id not in self.pending:
+            self.pending[chat_id] = []
+            # The loop clock, so an accelerated replay loop shortens the window too
+            self.deadlines[chat_id] = asyncio.get_running_loop().time() + self.window
+        self.pending[chat_id].append(item)
+
+        if self.flusher is None or self.flusher.done():
+            self.flusher = asyncio.create_task(self.run())
+
+    def take_due(self, now: float) -> dict:
+        due = {}
+        for chat_id, deadline in list(self.deadlines.items()):
+            if deadline <= now:
+                del self.deadlines[chat_id]
+                due[chat_id] = self.pending.pop(chat_id)
+        return due
+
+    async def run(self):
+        """Sleep until the earliest window closes and flush every chat that is due"""
+        # The window is fixed, so chats queued later never close before the current earliest
+        loop = asyncio.get_running_loop()
+        while self.deadlines:
+            delay = min(self.deadlines.values()) - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            due = self.take_due(loop.time())
+            if due:
+                try:
+                    await self.flush(due)
+                except Exception as e:
+                    log.error("Error flushing coalesced notifications", extra={'error': str(e)})
+
+    async def flush_all(self):
+        """Deliver everything still queued, used on shutdown"""
+        if self.flusher is not None:
+            self.flusher.cancel()
+        self.deadlines.clear()
+        due, self.pending = self.pending, {}
+        if due:
+            log.info(f"Flushing {sum(len(items) for items in due.values())} queued notifications")
+            await self.flush(due)
+
+
+def build_coalescer(flush) -> NotificationCoalescer:
+    """Create a NotificationCoalescer from environment settings, disabled by default"""
+    return NotificationCoalescer(float(os.getenv('COALESCE_WINDOW', '0')), flush)
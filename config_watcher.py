@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import os
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # Not installed or not on Linux, fall back to polling
+    INotify = None
+
+log = logging.getLogger('ytbot.watcher')
+
+
+class ConfigWatcher:
+    """Watch the Pydata files and reload them when they are edited by hand"""
+
+    def __init__(self, config, on_change, poll_interval: float = 5.0):
+        self.config = config
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.inotify = None
+
+    def start_inotify(self) -> bool:
+        """Watch the data folder with inotify, returns False if unavailable"""
+        if INotify is None:
+            return False
+        try:
+            self.inotify = INotify()
+            # Watch the folder, editors often save by writing a new file and renaming it
+            self.inotify.add_watch(
+                str(self.config.data_folder),
+                flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE
+            )
+            return True
+        except OSError as e:
+            log.warning("inotify unavailable, falling back to polling", extra={'error': str(e)})
+            self.inotify = None
+            return False
+
+    def safe_check_files(self):
+        """check_files, logging instead of raising so one bad reload doesn't stop the watcher"""
+        try:
+            self.check_files()
+        except Exception as e:
+            log.error("Error applying config change", extra={'error': str(e)})
+
+    def check_files(self):
+        """Reload any config file that changed on disk since it was last read or written"""
+        if self.config.is_modified(self.config.channels_file):
+            diff = self.config.reload_channels()
+            if diff is not None:
+                self.on_change('channels', diff)
+
+        if self.config.is_modified(self.config.chats_file):
+            diff = self.config.reload_chats()
+            if diff is not None:
+                self.on_change('chats', diff)
+
+    async def run(self, shutdown_event: asyncio.Event):
+        """Watch until shutdown, using inotify when possible"""
+        if self.start_inotify():
+            log.info(f"Watching {self.config.data_folder} for changes (inotify)")
+            await self.run_inotify(shutdown_event)
+        else:
+            log.info(f"Watching {self.config.data_folder} for changes (polling every {self.poll_interval}s)")
+            await self.run_polling(shutdown_event)
+
+    async def run_inotify(self, shutdown_event: asyncio.Event):
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+        watched = {self.config.chats_file.name, self.config.channels_file.name}
+
+        def on_readable():
+            if any(event.name in watched for event in self.inotify.read(timeout=0)):
+                changed.set()
+
+        loop.add_reader(self.inotify.fileno(), on_readable)
+        try:
+            while not shutdown_event.is_set():
+                changed_wait = asyncio.create_task(changed.wait())
+                shutdown_wait = asyncio.create_task(shutdown_event.wait())
+                await asyncio.wait({changed_wait, shutdown_wait}, return_when=asyncio.FIRST_COMPLETED)
+                changed_wait.cancel()
+                shutdown_wait.cancel()
+                if shutdown_event.is_set():
+                    break
+
+                # Let a burst of write events settle before reading the file
+                await asyncio.sleep(0.5)
+                changed.clear()
+                self.safe_check_files()
+        finally:
+            loop.remove_reader(self.inotify.fileno())
+            self.inotify.close()
+
+    async def run_polling(self, shutdown_event: asyncio.Event):
+        while not shutdown_event.is_set():
+            try:
+                await asyncio.wait_for(shutdown_event.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                self.safe_check_files()
+
+
+def build_config_watcher(config, on_change) -> ConfigWatcher:
+    """Create a ConfigWatcher from environment settings"""
+    return ConfigWatcher(
+        config,
+        on_change,
+        poll_interval=float(os.getenv('CONFIG_POLL_INTERVAL', '5')),
+    )
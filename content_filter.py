@@ -0,0 +1,262 @@
+import json
+import logging
+import re
+
+log = logging.getLogger('ytbot.filters')
+
+# YouTube has no Shorts flag, so a #shorts tag or a very short runtime marks one
+SHORTS_TAG = '#shorts'
+SHORTS_MAX_DURATION = 60
+
+FLAGS = ('shorts', 'live', 'replays')
+
+ISO_DURATION = re.compile(
+    r'P(?:(?P<years>\d+)Y)?(?:(?P<months>\d+)M)?(?:(?P<weeks>\d+)W)?(?:(?P<days>\d+)D)?'
+    r'(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+(?:[.,]\d+)?)S)?)?'
+)
+
+
+def parse_duration(value: str) -> float:
+    """Parse an ISO-8601 duration like PT1H2M3S or P1DT30M into seconds"""
+    text = (value or '').strip().upper()
+    match = ISO_DURATION.fullmatch(text)
+    if match is None or text.endswith('T') or not any(match.groupdict().values()):
+        raise ValueError(f"Invalid ISO-8601 duration: {value!r}")
+    parts = match.groupdict()
+    if parts['years'] or parts['months']:
+        # Calendar units have no fixed length, YouTube never uses them
+        raise ValueError(f"Duration with years or months has no fixed length: {value!r}")
+    return (
+        int(parts['weeks'] or 0) * 604800
+        + int(parts['days'] or 0) * 86400
+        + int(parts['hours'] or 0) * 3600
+        + int(parts['minutes'] or 0) * 60
+        + float((parts['seconds'] or '0').replace(',', '.'))
+    )
+
+
+def to_seconds(value) -> float:
+    """A duration given as seconds or as an ISO-8601 string"""
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid duration: {value!r}")
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    return float(text) if text.replace('.', '', 1).isdigit() else parse_duration(text)
+
+
+def to_flag(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ('on', 'yes', 'true', '1'):
+        return True
+    if text in ('off', 'no', 'false', '0'):
+        return False
+    raise ValueError(f"Invalid on/off value: {value!r}")
+
+
+def normalize_filters(data: dict) -> dict:
+    """
+    Validate a chat's filter rules and bring them to canonical form
+
+    Accepted keys are min_duration and max_duration (seconds or ISO-8601),
+    include and exclude (keyword lists, matched case-insensitively against
+    the title) and the shorts, live and replays on/off flags.
+
+    Raises:
+        ValueError: On unknown keys or values that cannot be parsed
+    """
+    if not isinstance(data, dict):
+        raise ValueError(f"Filter rules must be an object, got {type(data).__name__}")
+    rules = {}
+    for key, value in data.items():
+        if key in ('min_duration', 'max_duration'):
+            rules[key] = to_seconds(value)
+        elif key in ('include', 'exclude'):
+            if isinstance(value, str):
+                keywords = value.split(',')
+            elif isinstance(value, (list, tuple)) and all(isinstance(keyword, str) for keyword in value):
+                keywords = value
+            else:
+                raise ValueError(f"{key} must be a list of keywords or a comma separated string")
+            keywords = sorted({str(keyword).strip().casefold() for keyword in keywords} - {''})
+            if keywords:
+                rules[key] = keywords
+        elif key in FLAGS:
+            rules[key] = to_flag(value)
+        else:
+            raise ValueError(f"Unknown filter rule: {key}")
+    if rules.get('min_duration', 0) > rules.get('max_duration', float('inf')):
+        raise ValueError("min_duration is larger than max_duration")
+    return rules
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over every keyword of every rule
+
+    A single pass over the text finds all keywords at once and returns them
+    as a bitmask, so matching cost depends on the title length, not on how
+    many keywords or chats there are.
+    """
+
+    def __init__(self, keywords):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [0]
+
+        for i, keyword in enumerate(keywords):
+            state = 0
+            for char in keyword:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(0)
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state] |= 1 << i
+
+        # Breadth first, so every fail target is finished before it is used
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, child in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[child] = target if target != child else 0
+                self.output[child] |= self.output[self.fail[child]]
+                queue.append(child)
+
+    def search(self, text: str) -> int:
+        """Bitmask of the keywords found anywhere in the text"""
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        found = 0
+        for char in text.casefold():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            found |= output[state]
+        return found
+
+
+class VideoInfo:
+    """What the rules look at, worked out once per video"""
+    __slots__ = ('duration', 'short', 'live', 'replay', 'keywords')
+
+    def __init__(self, video: dict, matcher: KeywordMatcher = None):
+        snippet = video['snippet']
+        title = snippet.get('title', '')
+        broadcast = snippet.get('liveBroadcastContent', 'none')
+
+        # Live announcements come from a lookup without contentDetails
+        try:
+            self.duration = parse_duration(video['contentDetails']['duration'])
+        except (KeyError, ValueError):
+            self.duration = None
+        self.live = broadcast in ('live', 'upcoming')
+        self.replay = not self.live and 'liveStreamingDetails' in video
+        text = f"{title}\n{snippet.get('description', '')}".casefold()
+        self.short = not self.live and (
+            SHORTS_TAG in text or (self.duration is not None and 0 < self.duration <= SHORTS_MAX_DURATION)
+        )
+        self.keywords = matcher.search(title) if matcher else 0
+
+
+class FilterRule:
+    """A compiled rule, keywords are bitmasks into the shared KeywordMatcher"""
+    __slots__ = ('min_duration', 'max_duration', 'include', 'exclude', 'shorts', 'live', 'replays')
+
+    def __init__(self, rules: dict, keyword_bits: dict):
+        self.min_duration = rules.get('min_duration')
+        self.max_duration = rules.get('max_duration')
+        self.include = sum(keyword_bits[keyword] for keyword in rules.get('include', ()))
+        self.exclude = sum(keyword_bits[keyword] for keyword in rules.get('exclude', ()))
+        self.shorts = rules.get('shorts', True)
+        self.live = rules.get('live', True)
+        self.replays = rules.get('replays', True)
+
+    def allows(self, info: VideoInfo) -> bool:
+        if info.live:
+            if not self.live:
+                return False
+        elif info.duration is not None:
+            # A live broadcast has no length yet, so only finished videos are measured
+            if self.min_duration is not None and info.duration < self.min_duration:
+                return False
+            if self.max_duration is not None and info.duration > self.max_duration:
+                return False
+        if info.replay and not self.replays:
+            return False
+        if info.short and not self.shorts:
+            return False
+        if info.keywords & self.exclude:
+            return False
+        return not self.include or bool(info.keywords & self.include)
+
+
+class ContentFilter:
+    """
+    Every chat's filter rules compiled into one matcher
+
+    Chats with identical rules share one compiled rule, and all keywords go
+    into a single Aho-Corasick automaton. A video is examined once and each
+    distinct rule is checked once, however many chats use it.
+    """
+
+    def __init__(self, chats):
+        open_chats = []
+        groups = {}
+        for chat in chats:
+            if not chat.filters:
+                open_chats.append(chat.id)
+                continue
+            try:
+                rules = normalize_filters(chat.filters)
+            except (ValueError, TypeError) as e:
+                # A broken rule shouldn't silence the chat
+                log.warning("Ignoring invalid chat filter", extra={'chat_id': chat.id, 'error': str(e)})
+                open_chats.append(chat.id)
+                continue
+            key = json.dumps(rules, sort_keys=True)
+            groups.setdefault(key, (rules, []))[1].append(chat.id)
+
+        keywords = sorted({
+            keyword
+            for rules, _ in groups.values()
+            for keyword in rules.get('include', []) + rules.get('exclude', [])
+        })
+        keyword_bits = {keyword: 1 << i for i, keyword in enumerate(keywords)}
+        self.matcher = KeywordMatcher(keywords) if keywords else None
+        self.open_chats = tuple(open_chats)
+        self.rules = [(FilterRule(rules, keyword_bits), tuple(chat_ids)) for rules, chat_ids in groups.values()]
+
+    def recipients(self, video: dict):
+        """Chat IDs that should get this video"""
+        if not self.rules:
+            return self.open_chats
+        info = VideoInfo(video, self.matcher)
+        chat_ids = list(self.open_chats)
+        for rule, rule_chat_ids in self.rules:
+            if rule.allows(info):
+                chat_ids.extend(rule_chat_ids)
+        return chat_ids
+
+
+def describe_filters(rules: dict) -> str:
+    """One line summary of a chat's rules for the admin commands"""
+    parts = []
+    if 'min_duration' in rules:
+        parts.append(f"min {rules['min_duration']:g}s")
+    if 'max_duration' in rules:
+        parts.append(f"max {rules['max_duration']:g}s")
+    if rules.get('include'):
+        parts.append("include: " + ", ".join(rules['include']))
+    if rules.get('exclude'):
+        parts.append("exclude: " + ", ".join(rules['exclude']))
+    for flag in FLAGS:
+        if flag in rules:
+            parts.append(f"{flag} {'on' if rules[flag] else 'off'}")
+    return "; ".join(parts) or "no filters"
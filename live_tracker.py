@@ -0,0 +1,181 @@
+import asyncio
+import heapq
+import logging
+import os
+import time
+from datetime import datetime
+
+log = logging.getLogger('ytbot.live')
+
+# videos.list accepts at most 50 IDs per call
+VIDEOS_PER_REQUEST = 50
+
+
+def parse_time(value: str) -> datetime:
+    """Parse a YouTube API timestamp like 2025-01-10T23:45:09Z"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+class LiveTracker:
+    """
+    Track upcoming premieres and livestreams until they start
+
+    Each broadcast sits in a heap keyed by the time it should be checked. A
+    single timer task sleeps until the earliest one is due and checks every
+    due video in one videos.list call, so no channel is polled more often.
+    """
+
+    def __init__(self, fetch_videos, on_live, check_delay: float = 30, retry_interval: float = 120,
+                 max_wait: float = 3600):
+        self.fetch_videos = fetch_videos
+        self.on_live = on_live
+        self.check_delay = check_delay
+        self.retry_interval = retry_interval
+        self.max_wait = max_wait
+        self.heap = []
+        self.scheduled = {}
+        self.wakeup = asyncio.Event()
+        # Running announcements, referenced so they aren't garbage collected mid-send
+        self.announcements = set()
+
+    def track(self, video: dict) -> bool:
+        """Start tracking an upcoming broadcast, returns False if it has no scheduled start"""
+        details = video.get('liveStreamingDetails', {})
+        if 'scheduledStartTime' not in details:
+            return False
+
+        video_id = video['id']
+        scheduled = parse_time(details['scheduledStartTime']).timestamp()
+        self.schedule(video_id, scheduled, scheduled + self.check_delay)
+        log.info(
+            f"Tracking upcoming broadcast: {video['snippet']['title']}",
+            extra={'video_id': video_id, 'channel_id': video['snippet']['channelId']}
+        )
+        return True
+
+    def schedule(self, video_id: str, scheduled: float, check_at: float):
+        # A rescheduled entry replaces the old one, stale heap entries are skipped when popped
+        self.scheduled[video_id] = (scheduled, check_at)
+        heapq.heappush(self.heap, (check_at, video_id))
+        self.wakeup.set()
+
+    def take_due(self, now: float) -> list:
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            check_at, video_id = heapq.heappop(self.heap)
+            entry = self.scheduled.get(video_id)
+            if entry is not None and entry[1] == check_at:
+                due.append(video_id)
+        return due
+
+    def next_check(self):
+        """Time of the next live entry, dropping stale heap entries on the way"""
+        while self.heap:
+            check_at, video_id = self.heap[0]
+            entry = self.scheduled.get(video_id)
+            if entry is not None and entry[1] == check_at:
+                return check_at
+            heapq.heappop(self.heap)
+        return None
+
+    async def run(self, shutdown_event: asyncio.Event):
+        """Sleep until the next broadcast is due, check it, repeat until shutdown"""
+        while not shutdown_event.is_set():
+            self.wakeup.clear()
+            next_check = self.next_check()
+            timeout = None if next_check is None else max(next_check - time.time(), 0)
+
+            waiters = {asyncio.create_task(self.wakeup.wait()), asyncio.create_task(shutdown_event.wait())}
+            done, pending = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in pending:
+                task.cancel()
+            if shutdown_event.is_set():
+                break
+            if self.wakeup.is_set():
+                # Something new was scheduled, recompute the next wake time
+                continue
+
+            due = self.take_due(time.time())
+            for i in range(0, len(due), VIDEOS_PER_REQUEST):
+                try:
+                    await self.check(due[i:i + VIDEOS_PER_REQUEST])
+                except Exception as e:
+                    log.error("Error checking upcoming broadcasts", extra={'error': str(e)})
+                    now = time.time()
+                    for video_id in due[i:i + VIDEOS_PER_REQUEST]:
+                        # Entries already announced or dropped before the error are gone
+                        entry = self.scheduled.get(video_id)
+                        if entry is not None:
+                            self.reschedule_or_drop(video_id, entry[0], now)
+
+    async def check(self, video_ids: list):
+        """Look up due broadcasts once and announce the ones that went live"""
+        videos = {video['id']: video for video in self.fetch_videos(video_ids)}
+        now = time.time()
+
+        for video_id in video_ids:
+            scheduled, _ = self.scheduled[video_id]
+            video = videos.get(video_id)
+            if video is None:
+                log.info("Upcoming broadcast disappeared, no longer tracking", extra={'video_id': video_id})
+                del self.scheduled[video_id]
+                continue
+
+            details = video.get('liveStreamingDetails', {})
+            if 'actualEndTime' in details:
+                # Started and finished between two checks, the upload check picks up the replay
+                log.info("Broadcast already ended, not announcing it as live", extra={'video_id': video_id})
+                del self.scheduled[video_id]
+                continue
+
+            if 'actualStartTime' in details:
+                del self.scheduled[video_id]
+                latency = now - parse_time(details['actualStartTime']).timestamp()
+                log.info(
+                    f"Broadcast is live: {video['snippet']['title']}",
+                    extra={'video_id': video_id, 'latency_ms': round(latency * 1000)}
+                )
+                self.announce(video)
+                continue
+
+            new_start = details.get('scheduledStartTime')
+            if new_start and parse_time(new_start).timestamp() != scheduled:
+                # The creator moved the start time, wait for the new one
+                scheduled = parse_time(new_start).timestamp()
+                self.schedule(video_id, scheduled, scheduled + self.check_delay)
+                continue
+
+            self.reschedule_or_drop(video_id, scheduled, now)
+
+    def announce(self, video: dict):
+        """Run on_live in the background, so a long fan-out doesn't delay other due broadcasts"""
+        task = asyncio.create_task(self.on_live(video))
+        self.announcements.add(task)
+        task.add_done_callback(lambda t, video_id=video['id']: self.announced(t, video_id))
+
+    def announced(self, task: asyncio.Task, video_id: str):
+        self.announcements.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.error("Error announcing live broadcast", extra={'video_id': video_id, 'error': str(task.exception())})
+
+    def reschedule_or_drop(self, video_id: str, scheduled: float, now: float):
+        """Try again later, unless the broadcast is long overdue"""
+        if now - scheduled > self.max_wait:
+            log.info("Broadcast did not start in time, no longer tracking", extra={'video_id': video_id})
+            del self.scheduled[video_id]
+        else:
+            self.schedule(video_id, scheduled, now + self.retry_interval)
+
+    def is_tracking(self, video_id: str) -> bool:
+        return video_id in self.scheduled
+
+
+def build_live_tracker(fetch_videos, on_live) -> LiveTracker:
+    """Create a LiveTracker from environment settings"""
+    return LiveTracker(
+        fetch_videos,
+        on_live,
+        check_delay=float(os.getenv('LIVE_CHECK_DELAY', '30')),
+        retry_interval=float(os.getenv('LIVE_RETRY_INTERVAL', '120')),
+        max_wait=float(os.getenv('LIVE_MAX_WAIT', '3600')),
+    )
@@ -0,0 +1,106 @@
+import asyncio
+import cProfile
+import functools
+import io
+import logging
+import pstats
+import time
+from datetime import datetime, timezone
+from telegram_config import ChannelRecord
+
+log = logging.getLogger('ytbot.profiler')
+
+# Coroutines whose individual awaits are timed while a session is running
+ENGINE_METHODS = ('check_channel', 'process_video')
+TENANT_METHODS = ('send_notifications', 'send_notification_to_chat')
+
+
+class ProfileSession:
+    """
+    Profile the detection engine and every tenant bot for a fixed window
+
+    Nothing is installed until start() is called: cProfile is enabled and the
+    traced coroutines are wrapped as instance attributes for the window only,
+    then both are removed again, so there is no cost when profiling is off.
+    """
+
+    def __init__(self, engine, duration: int):
+        self.engine = engine
+        self.duration = duration
+        self.profile = cProfile.Profile()
+        self.awaits = []
+        self.started_at = None
+
+    def wrap(self, name, method):
+        @functools.wraps(method)
+        async def traced(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                self.awaits.append((time.perf_counter() - started, name, self.describe(args)))
+        return traced
+
+    @staticmethod
+    def describe(args) -> str:
+        """Short label for the call arguments, e.g. the channel name or chat ID"""
+        for arg in args:
+            if isinstance(arg, ChannelRecord):
+                return arg.name
+            if isinstance(arg, dict):
+                return str(arg.get('id', ''))
+            if isinstance(arg, (int, str)) and not isinstance(arg, bool):
+                return str(arg)[:60]
+        return ''
+
+    def targets(self):
+        yield self.engine, ENGINE_METHODS
+        for tenant in self.engine.tenants:
+            yield tenant, TENANT_METHODS
+
+    def start(self):
+        self.started_at = datetime.now(timezone.utc)
+        for target, names in self.targets():
+            for name in names:
+                # Bound methods are looked up per call, so an instance attribute shadows them
+                setattr(target, name, self.wrap(name, getattr(target, name)))
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        for target, names in self.targets():
+            for name in names:
+                target.__dict__.pop(name, None)
+
+    async def run(self) -> str:
+        """Profile for the configured duration and return the report"""
+        self.start()
+        try:
+            await asyncio.sleep(self.duration)
+        finally:
+            self.stop()
+        return self.report()
+
+    def report(self, top: int = 30) -> str:
+        out = io.StringIO()
+        out.write(f"Profile started {self.started_at:%Y-%m-%d %H:%M:%S} UTC, {self.duration}s\n\n")
+
+        out.write(f"=== Slowest awaits ({len(self.awaits)} traced calls) ===\n")
+        for elapsed, name, label in sorted(self.awaits, reverse=True)[:top]:
+            out.write(f"{elapsed * 1000:10.1f} ms  {name}({label})\n")
+
+        totals = {}
+        for elapsed, name, _ in self.awaits:
+            count, total = totals.get(name, (0, 0.0))
+            totals[name] = (count + 1, total + elapsed)
+        out.write("\n=== Await totals per method ===\n")
+        for name, (count, total) in sorted(totals.items(), key=lambda x: x[1][1], reverse=True):
+            out.write(f"{name:28} calls={count:6}  total={total:9.3f}s  avg={total / count * 1000:9.1f} ms\n")
+
+        stats = pstats.Stats(self.profile, stream=out)
+        stats.strip_dirs()
+        out.write("\n=== Hot spots by own time ===\n")
+        stats.sort_stats('tottime').print_stats(top)
+        out.write("\n=== Hot spots by cumulative time ===\n")
+        stats.sort_stats('cumulative').print_stats(top)
+        return out.getvalue()
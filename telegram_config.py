@@ -1,15 +1,114 @@
 import json
+import logging
 import os
+import sys
 from datetime import datetime
 from pathlib import Path
+from content_filter import ContentFilter
+
+log = logging.getLogger('ytbot.config')
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class ChatRecord:
+    """A configured Telegram chat, with its added_at timestamp kept as epoch seconds"""
+    __slots__ = ('id', 'title', 'type', 'added_at', 'filters')
+
+    def __init__(self, chat_id: int, title: str, chat_type: str, added_at: int, filters: dict = None):
+        self.id = chat_id
+        self.title = title
+        # Only a handful of chat types exist, so share one string object per type.
+        # PTB hands over a ChatType enum, str() turns it into the plain value first
+        self.type = sys.intern(str(chat_type))
+        self.added_at = added_at
+        # Content filter rules, None for the usual chat that gets everything
+        self.filters = filters or None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ChatRecord':
+        # Also used as a json object_hook, so each chat is converted as soon as
+        # it is parsed instead of holding the whole list of dicts in memory
+        try:
+            added_at = int(datetime.fromisoformat(data['added_at']).timestamp())
+        except (KeyError, TypeError, ValueError):
+            added_at = 0
+        chat_id = int(data['id'])
+        return cls(
+            chat_id, data.get('title') or str(chat_id), data.get('type') or 'unknown', added_at, data.get('filters')
+        )
+
+    @classmethod
+    def object_hook(cls, data: dict):
+        """json object_hook for telegram_chats.json, nested filter rules are left as dicts"""
+        return cls.from_dict(data) if 'id' in data else data
+
+    def to_dict(self) -> dict:
+        data = {
+            'id': self.id,
+            'title': self.title,
+            'type': self.type,
+            'added_at': self.added_text(),
+        }
+        if self.filters:
+            data['filters'] = self.filters
+        return data
+
+    def added_text(self) -> str:
+        """The added_at timestamp in the format used by telegram_chats.json"""
+        if not self.added_at:
+            return 'Unknown'
+        return datetime.fromtimestamp(self.added_at).strftime(DATE_FORMAT)
+
+    def __eq__(self, other):
+        if not isinstance(other, ChatRecord):
+            return NotImplemented
+        return (
+            (self.id, self.title, self.type, self.added_at, self.filters)
+            == (other.id, other.title, other.type, other.added_at, other.filters)
+        )
+
+    def __repr__(self):
+        return f"ChatRecord({self.to_dict()})"
+
+
+class ChannelRecord:
+    """A monitored YouTube channel"""
+    __slots__ = ('name', 'id')
+
+    def __init__(self, name: str, channel_id: str):
+        self.name = name
+        self.id = channel_id.strip()
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ChannelRecord':
+        return cls(data['name'], data['id'])
+
+    @classmethod
+    def object_hook(cls, data: dict):
+        """json object_hook for influencers.json, converting only the channel entries"""
+        return cls.from_dict(data) if 'id' in data else data
+
+    def to_dict(self) -> dict:
+        return {'name': self.name, 'id': self.id}
+
+    def __eq__(self, other):
+        if not isinstance(other, ChannelRecord):
+            return NotImplemented
+        return (self.name, self.id) == (other.name, other.id)
+
+    def __repr__(self):
+        return f"ChannelRecord({self.to_dict()})"
+
 
 class TelegramConfig:
-    def __init__(self):
+    def __init__(self, data_folder: Path = None):
         # Set the data folder using Path for cross-platform compatibility
         current_dir = Path(__file__).parent
-        self.data_folder = current_dir / 'Pydata'
+        self.data_folder = Path(data_folder) if data_folder else current_dir / 'Pydata'
         self.chats_file = self.data_folder / 'telegram_chats.json'
         self.channels_file = self.data_folder / 'influencers.json'
+        self.file_mtimes = {}
         self.ensure_data_folder()
         self.load_chats()
         self.load_channels()
@@ -18,17 +117,17 @@ class TelegramConfig:
         """Create pydata folder and initialize files if they don't exist"""
         # Create pydata folder
         if not self.data_folder.exists():
-            print(f"Creating data folder: {self.data_folder}")
+            log.info(f"Creating data folder: {self.data_folder}")
             self.data_folder.mkdir(parents=True, exist_ok=True)
 
         # Initialize telegram_chats.json if doesn't exist
         if not self.chats_file.exists():
-            print(f"Initializing chats file: {self.chats_file}")
+            log.info(f"Initializing chats file: {self.chats_file}")
             self.save_chats([])
 
         # Initialize influencers.json if doesn't exist
         if not self.channels_file.exists():
-            print(f"Initializing channels file: {self.channels_file}")
+            log.info(f"Initializing channels file: {self.channels_file}")
             initial_channels = {
                 "channels": [
                     {"name": "MikeTamago-", "id": "UCR3aArAyYGXwJegyRGZ7WTg"},
@@ -39,55 +138,102 @@ class TelegramConfig:
             with open(self.channels_file, 'w') as f:
                 json.dump(initial_channels, f, indent=4)
 
+    def read_chats(self) -> list:
+        """Parse telegram_chats.json, raising ValueError unless it is a list of chats"""
+        with open(self.chats_file, 'r') as f:
+            chats = json.load(f, object_hook=ChatRecord.object_hook)
+        # The object_hook leaves entries without an id as dicts, and turns a lone object into one record
+        if not isinstance(chats, list) or not all(isinstance(chat, ChatRecord) for chat in chats):
+            raise ValueError(f"{self.chats_file.name} must be a list of chats, each with an id")
+        return chats
+
+    def read_channels(self) -> list:
+        """Parse influencers.json, raising ValueError unless it holds a list of channels"""
+        with open(self.channels_file, 'r') as f:
+            data = json.load(f, object_hook=ChannelRecord.object_hook)
+        channels = data.get('channels', []) if isinstance(data, dict) else None
+        if not isinstance(channels, list) or not all(isinstance(channel, ChannelRecord) for channel in channels):
+            raise ValueError(f"{self.channels_file.name} must hold a channels list, each with a name and id")
+        return channels
+
     def load_chats(self):
         """Load chats from JSON file"""
         try:
-            with open(self.chats_file, 'r') as f:
-                self.chats = json.load(f)
-            print(f"Loaded {len(self.chats)} chats from {self.chats_file}")
-        except (FileNotFoundError, json.JSONDecodeError):
-            print(f"No existing chats file found, starting fresh")
-            self.chats = []
-            self.save_chats(self.chats)
+            self.set_chats(self.read_chats())
+            self.remember_mtime(self.chats_file)
+            log.info(f"Loaded {len(self.chats)} chats from {self.chats_file}")
+        except FileNotFoundError:
+            log.info(f"No existing chats file found, starting fresh")
+            self.save_chats([])
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            # json.JSONDecodeError is a ValueError too
+            log.error(f"Error loading chats file, starting fresh: {str(e)}")
+            self.save_chats([])
 
     def load_channels(self):
         """Load YouTube channels from influencers.json"""
         try:
-            with open(self.channels_file, 'r') as f:
-                data = json.load(f)
-                self.channels = data.get('channels', [])
-            print(f"Loaded {len(self.channels)} channels from {self.channels_file}")
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            print(f"Error loading channels file: {str(e)}")
-            self.channels = []
+            self.set_channels(self.read_channels())
+            self.remember_mtime(self.channels_file)
+            log.info(f"Loaded {len(self.channels)} channels from {self.channels_file}")
+        except (FileNotFoundError, ValueError, KeyError, TypeError, AttributeError) as e:
+            log.error(f"Error loading channels file: {str(e)}")
+            self.set_channels([])
+
+    def remember_mtime(self, path: Path):
+        """Record the modification time of a file we just read or wrote"""
+        try:
+            self.file_mtimes[path] = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self.file_mtimes.pop(path, None)
+
+    def is_modified(self, path: Path) -> bool:
+        """Check if a file changed on disk since we last read or wrote it"""
+        try:
+            return path.stat().st_mtime_ns != self.file_mtimes.get(path)
+        except FileNotFoundError:
+            return False
+
+    def set_chats(self, chats):
+        """Replace the in-memory chats and drop the cached views"""
+        self.chats = tuple(chats)
+        self.chat_index = {chat.id: chat for chat in self.chats}
+        self.chat_ids_view = None
+        self.content_filter = None
+
+    def set_channels(self, channels):
+        """Replace the in-memory channels"""
+        # Tuples are never mutated, so a running check cycle keeps a stable snapshot
+        self.channels = tuple(channels)
+        self.channel_index = {channel.id: channel for channel in self.channels}
 
     def save_chats(self, chats):
         """Save chats to JSON file"""
         with open(self.chats_file, 'w') as f:
-            json.dump(chats, f, indent=2)
-        self.chats = chats
-        print(f"Saved {len(chats)} chats to {self.chats_file}")
+            json.dump([chat.to_dict() for chat in chats], f, indent=2)
+        self.set_chats(chats)
+        self.remember_mtime(self.chats_file)
+        log.info(f"Saved {len(chats)} chats to {self.chats_file}")
 
     def add_chat(self, chat_id: int, chat_title: str = None, chat_type: str = None) -> bool:
         """Add a chat to the list if not already present"""
         chat_id = int(chat_id)  # Ensure chat_id is int
         
         # Check if chat already exists
-        if chat_id in [chat['id'] for chat in self.chats]:
-            print(f"Chat {chat_id} already exists in config")
+        if chat_id in self.chat_index:
+            log.info(f"Chat {chat_id} already exists in config")
             return False
         
         # Add new chat with metadata
-        chat_data = {
-            'id': chat_id,
-            'title': chat_title or str(chat_id),
-            'type': chat_type or 'unknown',
-            'added_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
+        chat_data = ChatRecord(
+            chat_id,
+            chat_title or str(chat_id),
+            chat_type or 'unknown',
+            int(datetime.now().timestamp())
+        )
         
-        self.chats.append(chat_data)
-        self.save_chats(self.chats)
-        print(f"Added new chat: {chat_data}")
+        self.save_chats(self.chats + (chat_data,))
+        log.info(f"Added new chat: {chat_data.to_dict()}")
         return True
 
     def remove_chat(self, chat_id: int) -> bool:
@@ -96,16 +242,57 @@ class TelegramConfig:
         original_length = len(self.chats)
         
         # Remove chat if exists
-        self.chats = [chat for chat in self.chats if chat['id'] != chat_id]
+        chats = [chat for chat in self.chats if chat.id != chat_id]
         
-        if len(self.chats) < original_length:
-            self.save_chats(self.chats)
-            print(f"Removed chat {chat_id}")
+        if len(chats) < original_length:
+            self.save_chats(chats)
+            log.info(f"Removed chat {chat_id}")
             return True
-        print(f"Chat {chat_id} not found in config")
+        log.info(f"Chat {chat_id} not found in config")
         return False
 
+    def remove_chats(self, chat_ids) -> int:
+        """Remove several chats with a single save, returns how many were removed"""
+        chat_ids = {int(chat_id) for chat_id in chat_ids}
+        chats = [chat for chat in self.chats if chat.id not in chat_ids]
+        removed = len(self.chats) - len(chats)
+        if removed:
+            self.save_chats(chats)
+            log.info(f"Removed {removed} chats: {sorted(chat_ids)}")
+        return removed
+
+    def migrate_chat(self, old_chat_id: int, new_chat_id: int) -> bool:
+        """Point a chat at its new ID after a group was upgraded to a supergroup"""
+        old_chat = self.chat_index.get(int(old_chat_id))
+        if old_chat is None:
+            return False
+        if int(new_chat_id) in self.chat_index:
+            # The supergroup was added separately already, just drop the old group
+            return self.remove_chat(old_chat_id)
+
+        new_chat = ChatRecord(int(new_chat_id), old_chat.title, 'supergroup', old_chat.added_at, old_chat.filters)
+        self.save_chats([new_chat if chat.id == old_chat.id else chat for chat in self.chats])
+        log.info(f"Migrated chat {old_chat_id} to {new_chat_id}")
+        return True
+
+    def set_chat_filters(self, chat_id: int, filters: dict) -> bool:
+        """Replace a chat's content filter rules, an empty dict clears them"""
+        chat = self.chat_index.get(int(chat_id))
+        if chat is None:
+            return False
+        new_chat = ChatRecord(chat.id, chat.title, chat.type, chat.added_at, filters)
+        self.save_chats([new_chat if c.id == chat.id else c for c in self.chats])
+        log.info(f"Updated filters for chat {chat_id}: {filters or 'none'}")
+        return True
+
     #-------------------------------------------------------------------------#
+    def save_channels(self, channels):
+        """Save YouTube channels to influencers.json"""
+        with open(self.channels_file, 'w') as f:
+            json.dump({'channels': [c.to_dict() for c in channels]}, f, indent=4)
+        self.set_channels(channels)
+        self.remember_mtime(self.channels_file)
+
     def add_youtube_channel(self, channel_name: str, channel_id: str) -> bool:
         """Add a new YouTube channel to the configuration"""
         # Clean the input
@@ -113,18 +300,11 @@ class TelegramConfig:
         channel_id = channel_id.strip()
         
         # Check if channel already exists
-        if any(c['id'] == channel_id for c in self.channels):
+        if channel_id in self.channel_index:
             return False
             
         # Add new channel
-        self.channels.append({
-            'name': channel_name,
-            'id': channel_id
-        })
-        
-        # Save to file
-        with open(self.channels_file, 'w') as f:
-            json.dump({'channels': self.channels}, f, indent=4)
+        self.save_channels(self.channels + (ChannelRecord(channel_name, channel_id),))
         
         return True
 
@@ -134,38 +314,78 @@ class TelegramConfig:
         original_length = len(self.channels)
         
         # Remove channel if exists
-        self.channels = [c for c in self.channels if c['id'] != channel_id]
+        channels = [c for c in self.channels if c.id != channel_id]
         
-        if len(self.channels) < original_length:
-            # Save updated list to file
-            with open(self.channels_file, 'w') as f:
-                json.dump({'channels': self.channels}, f, indent=4)
+        if len(channels) < original_length:
+            self.save_channels(channels)
             return True
         
         return False
 
-    def get_youtube_channel(self, channel_id: str) -> dict:
+    def get_youtube_channel(self, channel_id: str) -> ChannelRecord:
         """Get a specific YouTube channel's information"""
-        channel_id = channel_id.strip()
-        for channel in self.channels:
-            if channel['id'] == channel_id:
-                return channel
-        return None
+        return self.channel_index.get(channel_id.strip())
     #-------------------------------------------------------------------------#
 
-    def get_chats(self) -> list:
-        """Get list of all chats with their metadata"""
+    @staticmethod
+    def diff_entries(old, new) -> dict:
+        """Compare two collections of records keyed by id"""
+        old_by_id = {entry.id: entry for entry in old}
+        new_by_id = {entry.id: entry for entry in new}
+        return {
+            'added': [new_by_id[i] for i in new_by_id if i not in old_by_id],
+            'removed': [old_by_id[i] for i in old_by_id if i not in new_by_id],
+            'changed': [new_by_id[i] for i in new_by_id if i in old_by_id and new_by_id[i] != old_by_id[i]],
+        }
+
+    def reload_chats(self) -> dict:
+        """Re-read telegram_chats.json and return what changed"""
+        try:
+            chats = self.read_chats()
+        except (FileNotFoundError, KeyError, TypeError, ValueError, AttributeError) as e:
+            # Keep the current chats while the file is half-written or broken
+            log.error(f"Error reloading chats file: {str(e)}")
+            return None
+
+        diff = self.diff_entries(self.chats, chats)
+        self.set_chats(chats)
+        self.remember_mtime(self.chats_file)
+        return diff
+
+    def reload_channels(self) -> dict:
+        """Re-read influencers.json and return what changed"""
+        try:
+            channels = self.read_channels()
+        except (FileNotFoundError, KeyError, TypeError, ValueError, AttributeError) as e:
+            log.error(f"Error reloading channels file: {str(e)}")
+            return None
+
+        diff = self.diff_entries(self.channels, channels)
+        self.set_channels(channels)
+        self.remember_mtime(self.channels_file)
+        return diff
+
+    def get_chats(self) -> tuple:
+        """Get all chats with their metadata"""
         return self.chats
 
-    def get_chat_ids(self) -> list:
-        """Get list of just the chat IDs"""
-        return [chat['id'] for chat in self.chats]
+    def get_chat_ids(self) -> tuple:
+        """Get just the chat IDs, cached until the chats change"""
+        if self.chat_ids_view is None:
+            self.chat_ids_view = tuple(chat.id for chat in self.chats)
+        return self.chat_ids_view
         
-    def get_telegram_chats(self) -> list:
-        """Get list of Telegram chat IDs"""
-        return [chat['id'] for chat in self.chats]
+    def get_telegram_chats(self) -> tuple:
+        """Get Telegram chat IDs"""
+        return self.get_chat_ids()
+
+    def get_content_filter(self) -> ContentFilter:
+        """Every chat's filter rules compiled together, cached until the chats change"""
+        if self.content_filter is None:
+            self.content_filter = ContentFilter(self.chats)
+        return self.content_filter
 
-    def get_youtube_channels(self) -> list:
+    def get_youtube_channels(self) -> tuple:
         """Get list of YouTube channels to monitor"""
         return self.channels
 
@@ -178,14 +398,14 @@ class TelegramConfig:
         
         print(f"\nMonitored YouTube Channels ({len(self.channels)}):")
         for channel in self.channels:
-            print(f"- {channel['name']} (ID: {channel['id']})")
+            print(f"- {channel.name} (ID: {channel.id})")
         
         print(f"\nConfigured Telegram Chats ({len(self.chats)}):")
         if not self.chats:
             print("No chats configured")
         else:
             for chat in self.chats:
-                print(f"- {chat['title']} (ID: {chat['id']})")
-                print(f"  Type: {chat['type']}")
-                print(f"  Added: {chat['added_at']}")
-        print("="*30 + "\n")
\ No newline at end of file
+                print(f"- {chat.title} (ID: {chat.id})")
+                print(f"  Type: {chat.type}")
+                print(f"  Added: {chat.added_text()}")
+        print("="*30 + "\n")
@@ -0,0 +1,102 @@
+import os
+import time
+import httpx
+from telegram.error import TimedOut
+from telegram.request import HTTPXRequest
+
+
+class NotificationRequest(HTTPXRequest):
+    """HTTPXRequest with a sized connection pool that tracks its own saturation"""
+
+    def __init__(self, pool_size: int = 16, http_version: str = '1.1', keepalive_expiry: float = 30.0,
+                 transport: httpx.AsyncBaseTransport = None):
+        self.pool_size = pool_size
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        # Highest in flight since startup, unlike peak_in_flight it is never reset
+        self.max_in_flight = 0
+        self.total_requests = 0
+        self.pool_timeouts = 0
+        # Set to a TraceRecorder to capture every Bot API result
+        self.recorder = None
+
+        httpx_kwargs = {
+            'limits': httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        }
+        if transport is not None:
+            # Used by the replay engine to answer requests without a network
+            httpx_kwargs['transport'] = transport
+
+        super().__init__(
+            connection_pool_size=pool_size,
+            http_version=http_version,
+            read_timeout=30,
+            write_timeout=30,
+            connect_timeout=30,
+            pool_timeout=30,
+            httpx_kwargs=httpx_kwargs,
+        )
+
+    async def do_request(self, url, method, request_data=None, *args, **kwargs):
+        """Send a request while counting how many pool slots are in use"""
+        self.in_flight += 1
+        self.total_requests += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        started = time.perf_counter()
+        try:
+            status, payload = await super().do_request(url, method, request_data, *args, **kwargs)
+            if self.recorder is not None:
+                self.recorder.record_telegram(url, request_data, status, payload, time.perf_counter() - started)
+            return status, payload
+        except TimedOut as e:
+            # PTB re-raises httpx.PoolTimeout as TimedOut; the cause tells them apart
+            if isinstance(e.__cause__, httpx.PoolTimeout):
+                self.pool_timeouts += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    def saturation(self) -> float:
+        """Fraction of the connection pool currently in use"""
+        return self.in_flight / self.pool_size if self.pool_size else 0.0
+
+    def get_metrics(self) -> dict:
+        """Snapshot of the pool usage counters"""
+        return {
+            'pool_size': self.pool_size,
+            'in_flight': self.in_flight,
+            'peak_in_flight': self.peak_in_flight,
+            'saturation': round(self.saturation(), 3),
+            'peak_saturation': round(self.peak_in_flight / self.pool_size, 3) if self.pool_size else 0.0,
+            'max_in_flight': self.max_in_flight,
+            'total_requests': self.total_requests,
+            'pool_timeouts': self.pool_timeouts,
+        }
+
+    def reset_peak(self):
+        """Start a new measurement window for the peak counter"""
+        self.peak_in_flight = self.in_flight
+
+
+def build_notification_request(transport: httpx.AsyncBaseTransport = None) -> NotificationRequest:
+    """Create the request object used by the notification sender from environment settings"""
+    return NotificationRequest(
+        pool_size=int(os.getenv('TELEGRAM_POOL_SIZE', '16')),
+        http_version=os.getenv('TELEGRAM_HTTP_VERSION', '1.1'),
+        keepalive_expiry=float(os.getenv('TELEGRAM_KEEPALIVE_EXPIRY', '30')),
+        transport=transport,
+    )
+
+
+def build_updates_request() -> HTTPXRequest:
+    """Create a small, separate pool for getUpdates long polling"""
+    return HTTPXRequest(
+        connection_pool_size=1,
+        read_timeout=30,
+        pool_timeout=30,
+    )
@@ -0,0 +1,42 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from content_filter import ContentFilter, normalize_filters, parse_duration
+from telegram_config import ChatRecord
+
+
+def video(title, duration='PT10M'):
+    return {'snippet': {'title': title, 'liveBroadcastContent': 'none'}, 'contentDetails': {'duration': duration}}
+
+
+def test_parse_duration():
+    assert parse_duration('PT1H2M3S') == 3723
+    assert parse_duration('P1DT30M') == 88200
+    assert parse_duration('P0D') == 0
+    for value in ('PT', 'P', 'P1DT', '1H', 'P1Y'):
+        with pytest.raises(ValueError):
+            parse_duration(value)
+
+
+@pytest.mark.parametrize('filters', ['spam', ['spam'], {'include': 5}, {'exclude': [1, 2]}, {'color': 'red'}])
+def test_invalid_filters_are_ignored(filters):
+    with pytest.raises(ValueError):
+        normalize_filters(filters)
+    chats = [ChatRecord(1, 'open', 'group', 0), ChatRecord(2, 'broken', 'group', 0, filters)]
+    assert sorted(ContentFilter(chats).recipients(video("anything"))) == [1, 2]
+
+
+def test_rules():
+    chats = [
+        ChatRecord(1, 'open', 'group', 0),
+        ChatRecord(2, 'no spam', 'group', 0, {'exclude': 'giveaway,crypto', 'shorts': 'off'}),
+        ChatRecord(3, 'long only', 'group', 0, {'min_duration': 'PT5M'}),
+        ChatRecord(4, 'minecraft', 'group', 0, {'include': ['minecraft']}),
+    ]
+    content_filter = ContentFilter(chats)
+    assert sorted(content_filter.recipients(video("Minecraft CRYPTO Giveaway"))) == [1, 3, 4]
+    assert sorted(content_filter.recipients(video("tiny", 'PT30S'))) == [1]
@@ -0,0 +1,55 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config_watcher import ConfigWatcher
+from telegram_config import ChatRecord, TelegramConfig
+
+
+def test_chat_record_from_telegram_chat():
+    telegram = pytest.importorskip('telegram')
+    chat = telegram.Chat(-1001234567890, telegram.constants.ChatType.SUPERGROUP, title="Test group")
+    record = ChatRecord(chat.id, chat.title, chat.type, 0)
+    assert record.type == 'supergroup'
+    assert type(record.type) is str
+
+
+def test_add_chat_from_telegram_chat(tmp_path):
+    telegram = pytest.importorskip('telegram')
+    config = TelegramConfig(tmp_path)
+    chat = telegram.Chat(-1001234567890, telegram.constants.ChatType.CHANNEL, title="Test channel")
+    assert config.add_chat(chat.id, chat.title, chat.type)
+    assert TelegramConfig(tmp_path).get_chats()[0].to_dict()['type'] == 'channel'
+
+
+@pytest.mark.parametrize('chats', [{'id': 5}, [{'title': 'no id'}], {'chats': []}])
+def test_malformed_chats_file_keeps_watching(tmp_path, chats):
+    config = TelegramConfig(tmp_path)
+    config.add_chat(1, 'kept', 'group')
+    changes = []
+    watcher = ConfigWatcher(config, lambda kind, diff: changes.append(kind))
+
+    (tmp_path / 'telegram_chats.json').write_text(json.dumps(chats))
+    config.file_mtimes.clear()
+    watcher.check_files()
+    assert config.get_chat_ids() == (1,)
+
+    # Startup with the same file doesn't crash either
+    assert TelegramConfig(tmp_path).get_chat_ids() == ()
+
+
+@pytest.mark.parametrize('channels', [{'id': 'UC1'}, {'channels': [{'name': 'no id'}]}, ['UC1'], {'channels': 5}])
+def test_malformed_channels_file_keeps_watching(tmp_path, channels):
+    config = TelegramConfig(tmp_path)
+    before = config.get_youtube_channels()
+    watcher = ConfigWatcher(config, lambda kind, diff: None)
+
+    (tmp_path / 'influencers.json').write_text(json.dumps(channels))
+    config.file_mtimes.clear()
+    watcher.check_files()
+    assert config.get_youtube_channels() == before
+    assert TelegramConfig(tmp_path).get_youtube_channels() == ()
@@ -0,0 +1,205 @@
+import collections
+import gzip
+import json
+import logging
+import os
+import re
+import time
+from types import SimpleNamespace
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import aiohttp
+import httplib2
+import httpx
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+
+log = logging.getLogger('ytbot.trace')
+
+# Query parameters that change on every call and would stop a replay from matching
+VOLATILE_PARAMS = {'key', 'publishedAfter', 'alt', 'prettyPrint'}
+
+
+def youtube_key(request: HttpRequest) -> str:
+    """Stable key for a YouTube API request, e.g. youtube.videos.list?id=abc&part=snippet"""
+    params = [(k, v) for k, v in parse_qsl(urlsplit(request.uri).query) if k not in VOLATILE_PARAMS]
+    return f"{request.methodId}?{urlencode(sorted(params))}"
+
+
+class TraceRecorder:
+    """
+    Write every response seen at the client boundary to a gzipped JSON lines file
+
+    One line per event: YouTube API responses, thumbnail fetches (size only,
+    the image bytes are not needed for load testing) and Telegram API results,
+    each with its offset from the start of the recording and its latency.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = gzip.open(path, 'wt', encoding='utf-8')
+        self.started = time.monotonic()
+        log.info(f"Recording traffic trace to {path}")
+
+    def write(self, kind: str, **fields):
+        fields['kind'] = kind
+        fields['t'] = round(time.monotonic() - self.started, 3)
+        self.file.write(json.dumps(fields, separators=(',', ':'), ensure_ascii=False) + '\n')
+
+    def record_config(self, tenants, channel_cache):
+        """Snapshot every tenant's chats and channels and the channel metadata the recording starts from"""
+        self.write(
+            'config',
+            tenants=[
+                {
+                    'name': tenant.name,
+                    'chats': [chat.to_dict() for chat in tenant.config.get_chats()],
+                    'channels': [channel.to_dict() for channel in tenant.config.get_youtube_channels()],
+                }
+                for tenant in tenants
+            ],
+            channel_cache=channel_cache.entries,
+        )
+
+    def record_telegram(self, url: str, request_data, status: int, payload: bytes, elapsed: float):
+        parameters = request_data.parameters if request_data else {}
+        self.write(
+            'telegram',
+            endpoint=url.rsplit('/', 1)[-1],
+            chat_id=parameters.get('chat_id'),
+            status=status,
+            body=payload.decode('utf-8', 'replace'),
+            elapsed=round(elapsed, 4),
+        )
+
+    def aiohttp_trace_config(self) -> aiohttp.TraceConfig:
+        """aiohttp hooks that record thumbnail downloads"""
+        recorder = self
+
+        async def on_request_start(session, context, params):
+            context.started = time.perf_counter()
+
+        async def on_request_end(session, context, params):
+            recorder.write(
+                'thumbnail',
+                url=str(params.url),
+                status=params.response.status,
+                size=params.response.content_length or 0,
+                elapsed=round(time.perf_counter() - context.started, 4),
+            )
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        return trace_config
+
+    def close(self):
+        self.file.close()
+        log.info(f"Traffic trace saved to {self.path}")
+
+
+def recording_request_class(recorder: TraceRecorder):
+    """googleapiclient request class that records every executed YouTube API call"""
+
+    class RecordingHttpRequest(HttpRequest):
+        def execute(self, http=None, num_retries=0):
+            started = time.perf_counter()
+            try:
+                response = super().execute(http=http, num_retries=num_retries)
+            except HttpError as e:
+                recorder.write(
+                    'youtube', key=youtube_key(self), status=e.resp.status,
+                    body=e.content.decode('utf-8', 'replace'), elapsed=round(time.perf_counter() - started, 4)
+                )
+                raise
+            recorder.write(
+                'youtube', key=youtube_key(self), status=200,
+                body=response, elapsed=round(time.perf_counter() - started, 4)
+            )
+            return response
+
+    return RecordingHttpRequest
+
+
+def build_recorder():
+    """Create a TraceRecorder if TRACE_RECORD is set to an output path"""
+    path = os.getenv('TRACE_RECORD')
+    return TraceRecorder(path) if path else None
+
+
+class Trace:
+    """A recorded trace, handing out responses in recorded order per request key"""
+
+    def __init__(self, path):
+        self.config = None
+        self.duration = 0.0
+        self.youtube = collections.defaultdict(collections.deque)
+        self.thumbnails = collections.defaultdict(collections.deque)
+        self.telegram = collections.defaultdict(collections.deque)
+
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                event = json.loads(line)
+                self.duration = max(self.duration, event['t'])
+                kind = event['kind']
+                if kind == 'config':
+                    self.config = event
+                elif kind == 'youtube':
+                    self.youtube[event['key']].append(event)
+                elif kind == 'thumbnail':
+                    self.thumbnails[event['url']].append(event)
+                elif kind == 'telegram':
+                    self.telegram[(event['endpoint'], event['chat_id'])].append(event)
+
+    @staticmethod
+    def take(queues, key):
+        """Next recorded response for a key; the last one is reused once the queue runs dry"""
+        queue = queues.get(key)
+        if not queue:
+            return None
+        return queue.popleft() if len(queue) > 1 else queue[0]
+
+
+def replay_request_class(trace: Trace, speed: float, on_response=None):
+    """googleapiclient request class that answers from a trace instead of the network"""
+
+    class ReplayHttpRequest(HttpRequest):
+        def execute(self, http=None, num_retries=0):
+            event = trace.take(trace.youtube, youtube_key(self))
+            if event is None:
+                return {'items': []}
+            # Blocking on purpose, the real client blocks the event loop the same way
+            time.sleep(event['elapsed'] / speed)
+            if event['status'] != 200:
+                raise HttpError(httplib2.Response({'status': event['status']}), event['body'].encode('utf-8'))
+            if on_response is not None:
+                on_response(self.methodId, event['body'])
+            return event['body']
+
+    return ReplayHttpRequest
+
+
+def multipart_field(content: bytes, name: str):
+    match = re.search(rb'name="' + name.encode() + rb'"\r\n(?:[^\r\n]+\r\n)*\r\n(.*?)\r\n--', content, re.S)
+    return match.group(1).decode('utf-8', 'replace') if match else None
+
+
+def parse_telegram_request(request: httpx.Request) -> SimpleNamespace:
+    """Pull the endpoint, chat_id and caption text out of a Bot API request"""
+    content = request.content
+    if request.headers.get('content-type', '').startswith('multipart/form-data'):
+        fields = {name: multipart_field(content, name) for name in ('chat_id', 'caption', 'media')}
+    else:
+        fields = {k: str(v) for k, v in json.loads(content or b'{}').items()}
+    chat_id = fields.get('chat_id')
+    return SimpleNamespace(
+        endpoint=request.url.path.rsplit('/', 1)[-1],
+        chat_id=int(chat_id) if chat_id and chat_id.lstrip('-').isdigit() else chat_id,
+        text=(fields.get('caption') or '') + (fields.get('media') or ''),
+    )
+
+
+def synthetic_result(endpoint: str, chat_id) -> dict:
+    """A successful Bot API result for requests the trace has no recording of"""
+    message = {'message_id': 1, 'date': int(time.time()), 'chat': {'id': chat_id or 0, 'type': 'supergroup'}}
+    return {'ok': True, 'result': [message] if endpoint == 'sendMediaGroup' else message}